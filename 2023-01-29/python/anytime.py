@@ -0,0 +1,206 @@
+"""Solve a 15 puzzle quickly, then improve the solution while time allows."""
+
+from __future__ import annotations
+
+from argparse import ArgumentParser
+from collections.abc import Sequence
+from heapq import heappop, heappush
+from itertools import count
+from time import perf_counter
+from typing import TYPE_CHECKING, Final, NamedTuple
+
+from fifteenpuzzle import (as_puzzle_input, read_arrangement, scramble,
+                           valid_permutation)
+from idastar import SearchLimitReached, linear_conflict
+from integerpermutations import IDENTITY, IntegerPermutation
+from packedboard import (GOAL, OPPOSITE, apply_move, blank_position, pack,
+                         replay, successors, to_board)
+
+if TYPE_CHECKING:
+    from patterndb import AdditiveHeuristic
+
+# This is restarting weighted A*: each pass is an A* search ordered by
+# g + w * h for a weight w >= 1, which finds a route at most w times longer
+# than the shortest. Later passes use smaller weights and skip any state that
+# cannot lead to a route shorter than the best one found so far. The pass with
+# w = 1 is plain A*, and if it finishes the route is optimal.
+
+WEIGHTS: Final[tuple[float, ...]] = (5.0, 3.0, 2.0, 1.5, 1.25, 1.0)
+
+# The node budget is checked on every expansion, but the clock only this often.
+CHECK_INTERVAL: Final[int] = 256
+
+
+class AnytimeSolution(NamedTuple):
+    """
+    A route, and a bound on how far it is from the shortest.
+
+    The route is at most ``bound`` times as long as the shortest one; a bound
+    of 1 means it is optimal.
+    """
+
+    moves: str
+    tiles: list[int]
+    bound: float
+
+
+class AnytimeRoute(tuple):
+    """
+    A ``(moves, tiles)`` pair, like the other solvers return, with the bound of
+    an ``AnytimeSolution`` as an attribute.
+    """
+
+    bound: float
+
+    def __new__(
+        cls: type[AnytimeRoute], moves: str, tiles: list[int], bound: float
+    ) -> AnytimeRoute:
+        """Make the pair and attach the bound."""
+        route = super().__new__(cls, (moves, tiles))
+        route.bound = bound
+        return route
+
+    def __getnewargs__(self: AnytimeRoute) -> tuple[str, list[int], float]:
+        """Pickle the bound along with the pair."""
+        return self[0], self[1], self.bound
+
+
+class _OutOfBudget(Exception):
+    """Raised inside a pass when the time or node budget runs out."""
+
+
+def _route(came_by: dict[int, str], state: int) -> str:
+    """Rebuild the moves that reached a state by undoing them one at a time."""
+    moves: list[str] = []
+    blank = blank_position(state)
+    while direction := came_by[state]:
+        moves.append(direction)
+        state, blank, _ = apply_move(state, blank, OPPOSITE[direction])
+    return "".join(reversed(moves))
+
+
+def search(
+    puzzle: IntegerPermutation,
+    heuristic: AdditiveHeuristic | None = None,
+    time_budget: float | None = None,
+    node_budget: int | None = None,
+    weights: Sequence[float] = WEIGHTS,
+) -> AnytimeSolution:
+    """
+    Find a route within the budgets, improving it as long as they allow, and say
+    how far from the shortest it can be.
+
+    :param heuristic: Pattern databases from ``patterndb.load``, if any.
+    :param time_budget: Stop after about this many seconds.
+    :param node_budget: Stop after expanding this many nodes in total.
+    :param weights: The weight for each pass, ending with 1 for an optimal route.
+    :raises SearchLimitReached: If no route at all is found within the budgets.
+    """
+    if not valid_permutation(puzzle):
+        raise ValueError("Not a valid puzzle layout.")
+    deadline = None if time_budget is None else perf_counter() + time_budget
+    start, start_blank = pack(puzzle)
+
+    def estimate(state: int) -> int:
+        board = to_board(state)
+        h = linear_conflict(board)
+        return h if heuristic is None else max(h, heuristic.from_board(board))
+
+    best_moves: str | None = "" if start == GOAL else None
+    lower_bound = estimate(start)
+    nodes_expanded = 0
+    for weight in weights:
+        if best_moves is not None and len(best_moves) <= lower_bound:
+            break
+        g_values = {start: 0}
+        h_values = {start: lower_bound}
+        came_by = {start: ""}
+        tiebreak = count()
+        frontier = [(weight * lower_bound, 0, next(tiebreak), start, start_blank)]
+        limit = len(best_moves) if best_moves is not None else 1_000
+        try:
+            while frontier:
+                _, g, _, state, blank = heappop(frontier)
+                if g != g_values[state]:
+                    continue
+                if state == GOAL:
+                    best_moves = _route(came_by, state)
+                    break
+                nodes_expanded += 1
+                if (node_budget is not None and nodes_expanded > node_budget) or (
+                    nodes_expanded % CHECK_INTERVAL == 0
+                    and deadline is not None
+                    and perf_counter() >= deadline
+                ):
+                    raise _OutOfBudget
+                for direction, _, new_state, new_blank in successors(state, blank):
+                    if g + 1 >= g_values.get(new_state, limit):
+                        continue
+                    if new_state not in h_values:
+                        h_values[new_state] = estimate(new_state)
+                    h = h_values[new_state]
+                    if g + 1 + h >= limit:
+                        continue
+                    g_values[new_state] = g + 1
+                    came_by[new_state] = direction
+                    priority = g + 1 + weight * h
+                    heappush(
+                        frontier,
+                        (priority, g + 1, next(tiebreak), new_state, new_blank),
+                    )
+            else:
+                # Nothing shorter than the best route exists.
+                lower_bound = limit
+                break
+        except _OutOfBudget:
+            # Some open state lies on a shortest route with its true distance,
+            # unless a state on it was skipped because it could not do better.
+            open_bound = min(
+                (g + h_values[state] for _, g, _, state, _ in frontier), default=limit
+            )
+            lower_bound = max(lower_bound, min(open_bound, limit))
+            break
+        lower_bound = max(lower_bound, int(-(-len(best_moves) // weight)))
+    if best_moves is None:
+        raise SearchLimitReached("No route found within the budget")
+    moves = best_moves
+    bound = len(moves) / lower_bound if lower_bound else 1.0
+    return AnytimeSolution(moves, replay(start, start_blank, moves)[2], bound)
+
+
+def solve(
+    puzzle: IntegerPermutation,
+    heuristic: AdditiveHeuristic | None = None,
+    time_budget: float | None = None,
+    node_budget: int | None = None,
+    weights: Sequence[float] = WEIGHTS,
+) -> AnytimeRoute:
+    """
+    Find a route within the budgets, and return the moves and tiles moved.
+
+    This is ``search`` returning a pair like the other solvers, with the bound
+    kept in its ``bound`` attribute.
+    """
+    solution = search(puzzle, heuristic, time_budget, node_budget, weights)
+    return AnytimeRoute(solution.moves, solution.tiles, solution.bound)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("filename", nargs="?", help="file with the puzzle layout")
+    parser.add_argument("--time-budget", type=float, help="seconds to search for")
+    parser.add_argument("--node-budget", type=int, help="nodes to expand")
+    args = parser.parse_args()
+    if args.filename is not None:
+        with open(args.filename, "rt") as infile:
+            puzzle = read_arrangement(infile.read())
+    else:
+        puzzle = scramble(IDENTITY)
+
+    print(as_puzzle_input(puzzle))
+    print("\n---\n")
+    solution = search(
+        puzzle, time_budget=args.time_budget, node_budget=args.node_budget
+    )
+    print("\n".join(str(k) for k in solution.tiles))
+    print(f"\n{len(solution.moves)} moves, at most {solution.bound:.3f} times optimal")
@@ -0,0 +1,161 @@
+"""Solve many 15 puzzles across worker processes, writing one JSON line each."""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+from argparse import ArgumentParser
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from time import perf_counter
+from typing import TYPE_CHECKING, Any, Final, TextIO
+
+import patterndb
+from fifteenpuzzle import (read_arrangement, split_arrangements,
+                           valid_permutation)
+from idastar import IDAStar, SearchLimitReached, to_board
+
+if TYPE_CHECKING:
+    from patterndb import AdditiveHeuristic
+
+# Puzzles are read from files in the format of ``read_arrangement``, several to
+# a file if separated by blank lines. Each puzzle is named after its file, with
+# ``#n`` appended (counting from 1) if the file holds more than one.
+
+RECORD_KEYS: Final[tuple[str, ...]] = (
+    "puzzle",
+    "status",
+    "error",
+    "moves",
+    "tiles",
+    "nodes_expanded",
+    "seconds",
+)
+
+_heuristic: AdditiveHeuristic | None = None
+
+
+def read_puzzles(paths: list[str]) -> Iterator[tuple[str, str]]:
+    """Yield the name and text of each puzzle in the files and directories given."""
+    for path in paths:
+        if os.path.isdir(path):
+            filenames = sorted(
+                os.path.join(path, k)
+                for k in os.listdir(path)
+                if not k.startswith(".") and os.path.isfile(os.path.join(path, k))
+            )
+        else:
+            filenames = [path]
+        for filename in filenames:
+            with open(filename, "rt") as infile:
+                chunks = split_arrangements(infile.read())
+            if len(chunks) == 1:
+                yield filename, chunks[0]
+            else:
+                for idx, chunk in enumerate(chunks):
+                    yield f"{filename}#{idx + 1}", chunk
+
+
+def _init_worker(pattern_db: str | None) -> None:
+    """Load the pattern databases once per worker."""
+    global _heuristic
+    if pattern_db is not None:
+        _heuristic = patterndb.load(directory=pattern_db)
+
+
+def solve_one(
+    name: str,
+    text: str,
+    max_nodes: int | None = None,
+    time_limit: float | None = None,
+) -> dict[str, Any]:
+    """
+    Solve one puzzle with IDA* and describe the outcome as a dict.
+
+    Every outcome has the same keys, with ``None`` for those that do not apply.
+    """
+    result: dict[str, Any] = dict.fromkeys(RECORD_KEYS) | {"puzzle": name}
+    start_time = perf_counter()
+    try:
+        # read_arrangement fills in any missing tiles, so count them first.
+        if len(tokens := text.split()) != 16:
+            raise ValueError(f"Expected 16 tiles, found {len(tokens)}.")
+        puzzle = read_arrangement(text)
+        if sorted(puzzle(k) for k in range(1, 17)) != list(range(1, 17)):
+            raise ValueError("Expected each of E and 1 to 15 once.")
+        if not valid_permutation(puzzle):
+            raise ValueError("Not a valid puzzle layout.")
+    except ValueError as err:
+        return result | {"status": "invalid", "error": str(err)}
+    search = IDAStar(
+        to_board(puzzle),
+        heuristic=_heuristic,
+        max_nodes=max_nodes,
+        time_limit=time_limit,
+    )
+    try:
+        moves, tiles = search.run()
+    except SearchLimitReached as err:
+        result |= {"status": "limit", "error": str(err)}
+    else:
+        result |= {"status": "solved", "moves": moves, "tiles": tiles}
+    return result | {
+        "nodes_expanded": search.nodes_expanded,
+        "seconds": round(perf_counter() - start_time, 6),
+    }
+
+
+def run_batch(
+    paths: list[str],
+    outfile: TextIO,
+    workers: int | None = None,
+    max_nodes: int | None = None,
+    time_limit: float | None = None,
+    pattern_db: str | None = None,
+) -> int:
+    """
+    Solve every puzzle found and write a JSON line for each as it is finished.
+
+    Return the number of puzzles that were not solved.
+    """
+    num_unsolved = 0
+    with ProcessPoolExecutor(
+        workers, initializer=_init_worker, initargs=(pattern_db,)
+    ) as pool:
+        futures = [
+            pool.submit(solve_one, name, text, max_nodes, time_limit)
+            for name, text in read_puzzles(paths)
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            if result["status"] != "solved":
+                num_unsolved += 1
+            outfile.write(json.dumps(result) + "\n")
+            outfile.flush()
+    return num_unsolved
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("paths", nargs="+", help="puzzle files or directories")
+    parser.add_argument("--workers", type=int, help="number of processes")
+    parser.add_argument("--max-nodes", type=int, help="node limit per puzzle")
+    parser.add_argument("--time-limit", type=float, help="seconds per puzzle")
+    parser.add_argument(
+        "--pattern-db",
+        metavar="DIRECTORY",
+        help="use the pattern databases built by patterndb.py in DIRECTORY",
+    )
+    parser.add_argument("--output", help="write to this file instead of stdout")
+    args = parser.parse_args()
+    with open(args.output, "wt") if args.output else sys.stdout as outfile:
+        unsolved = run_batch(
+            args.paths,
+            outfile,
+            args.workers,
+            args.max_nodes,
+            args.time_limit,
+            args.pattern_db,
+        )
+    sys.exit(1 if unsolved else 0)
@@ -0,0 +1,254 @@
+"""Benchmark the Python 15 puzzle solvers on a fixed set of puzzles."""
+
+from __future__ import annotations
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import tracemalloc
+from argparse import ArgumentParser
+from multiprocessing import Pipe, Process
+from statistics import median
+from time import perf_counter
+from typing import TYPE_CHECKING, Any, Final
+
+import bruteforce
+import patterndb
+from batch import read_puzzles
+from fifteenpuzzle import read_arrangement
+from instrumentation import Instrumentation
+
+if TYPE_CHECKING:
+    from multiprocessing.connection import Connection
+
+# The instances in ``benchmarks/`` were made with ``corpus.py``, five random
+# walks for each depth, seeded with the depth:
+#
+#     python corpus.py benchmarks/depth_20.txt --count 5 --depth 20 --seed 20
+#
+# Other sets (such as Korf's 100 random instances, one puzzle per block in the
+# usual text format) can be benchmarked by naming their files.
+#
+# Every solver runs on every puzzle in a fresh process, which is stopped if it
+# takes longer than ``--time-limit``. The time and node counts come from one run
+# and the peak memory from another, as tracing allocations slows a search down.
+# Memory used by the worker processes of the "parallel" method is not counted.
+
+DEFAULT_INSTANCES: Final[str] = os.path.join(os.path.dirname(__file__), "benchmarks")
+
+DEFAULT_METHODS: Final[tuple[str, ...]] = ("best-first", "ida*")
+
+INSTRUMENTED: Final[frozenset[str]] = frozenset(
+    k for k, v in bruteforce.OPTIONS.items() if "instrumentation" in v
+)
+
+
+def measure(
+    method: str,
+    text: str,
+    pattern_db: str | None = None,
+    trace_memory: bool = False,
+    time_limit: float | None = None,
+) -> dict[str, Any]:
+    """Solve one puzzle with one method and describe how it went."""
+    puzzle = read_arrangement(text)
+    options: dict[str, Any] = {}
+    if pattern_db is not None and "heuristic" in bruteforce.OPTIONS[method]:
+        options["heuristic"] = patterndb.load(directory=pattern_db)
+    if method == "anytime" and time_limit is not None:
+        options["time_budget"] = time_limit
+    instrumentation = None
+    if method in INSTRUMENTED and not trace_memory:
+        instrumentation = Instrumentation(progress=None)
+        options["instrumentation"] = instrumentation
+    if trace_memory:
+        tracemalloc.start()
+    start_time = perf_counter()
+    moves = bruteforce.solve(puzzle, method, **options)[0]
+    seconds = perf_counter() - start_time
+    if trace_memory:
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return {"peak_memory": peak_memory}
+    result: dict[str, Any] = {"seconds": seconds, "length": len(moves)}
+    if instrumentation is not None:
+        nodes = instrumentation.stats.nodes_expanded
+        result |= {"nodes_expanded": nodes, "nodes_per_second": nodes / seconds}
+    return result
+
+
+def _measure_into(conn: Connection, *args) -> None:
+    """Send the result of ``measure`` (or the error it raised) down a pipe."""
+    try:
+        conn.send(measure(*args))
+    except Exception as err:
+        conn.send({"error": repr(err)})
+    finally:
+        conn.close()
+
+
+def measure_in_process(
+    method: str,
+    text: str,
+    pattern_db: str | None = None,
+    trace_memory: bool = False,
+    time_limit: float | None = None,
+) -> dict[str, Any]:
+    """Run ``measure`` in a new process, giving up after ``time_limit`` seconds."""
+    receiver, sender = Pipe(duplex=False)
+    proc = Process(
+        target=_measure_into,
+        args=(sender, method, text, pattern_db, trace_memory, time_limit),
+    )
+    proc.start()
+    sender.close()
+    # Allow a little longer than the limit, so the anytime method can stop itself.
+    timeout = None if time_limit is None else time_limit * 1.5 + 1
+    ready = receiver.poll(timeout)
+    if not ready:
+        proc.terminate()
+    proc.join()
+    if not ready:
+        return {"error": "time limit"}
+    try:
+        return receiver.recv()
+    except EOFError:
+        return {"error": f"exit code {proc.exitcode}"}
+
+
+def current_commit() -> str | None:
+    """Return the git commit being benchmarked, if there is one."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(
+    paths: list[str],
+    methods: list[str],
+    pattern_db: str | None = None,
+    time_limit: float | None = None,
+    repeat: int = 1,
+    memory: bool = True,
+) -> dict[str, Any]:
+    """
+    Benchmark each method on each puzzle.
+
+    :param repeat: Time each run this many times, keeping the fastest.
+    :param memory: Also make a run to measure the peak memory.
+    """
+    results: list[dict[str, Any]] = []
+    for name, text in read_puzzles(paths):
+        for method in methods:
+            runs = [
+                measure_in_process(method, text, pattern_db, False, time_limit)
+                for _ in range(repeat)
+            ]
+            result = min(runs, key=lambda k: k.get("seconds", float("inf")))
+            if memory and "error" not in result:
+                traced = measure_in_process(method, text, pattern_db, True, time_limit)
+                result["peak_memory"] = traced.get("peak_memory")
+            results.append({"puzzle": name, "method": method} | result)
+            print(json.dumps(results[-1]), file=sys.stderr)
+    return {
+        "commit": current_commit(),
+        "python": platform.python_version(),
+        "pattern_db": pattern_db is not None,
+        "time_limit": time_limit,
+        "results": results,
+    }
+
+
+def summarize(report: dict[str, Any], baseline: dict[str, Any] | None = None) -> str:
+    """Tabulate the results for each method, compared with a baseline if given."""
+    lines = [
+        f"{'method':<14}{'solved':>8}{'seconds':>10}{'nodes/s':>12}"
+        f"{'peak MiB':>10}{'length':>8}"
+        + ("" if baseline is None else f"{'speedup':>9}")
+    ]
+    methods = list(dict.fromkeys(k["method"] for k in report["results"]))
+    for method in methods:
+        results = [k for k in report["results"] if k["method"] == method]
+        solved = [k for k in results if "error" not in k]
+        rates = [k["nodes_per_second"] for k in solved if "nodes_per_second" in k]
+        memory = [k["peak_memory"] for k in solved if k.get("peak_memory") is not None]
+        lengths = [k["length"] for k in solved]
+        line = (
+            f"{method:<14}{len(solved):>4}/{len(results):<3}"
+            f"{sum(k['seconds'] for k in solved):>10.3f}"
+            + (f"{median(rates):>12,.0f}" if rates else f"{'-':>12}")
+            + (f"{max(memory) / 2**20:>10.1f}" if memory else f"{'-':>10}")
+            + (f"{median(lengths):>8.1f}" if lengths else f"{'-':>8}")
+        )
+        if baseline is not None:
+            # Compare the total time over the puzzles both runs solved.
+            before = {
+                k["puzzle"]: k["seconds"]
+                for k in baseline["results"]
+                if k["method"] == method and "error" not in k
+            }
+            common = [k for k in solved if k["puzzle"] in before]
+            old = sum(before[k["puzzle"]] for k in common)
+            new = sum(k["seconds"] for k in common)
+            line += f"{old / new:>8.2f}x" if common and new else f"{'-':>9}"
+        lines.append(line)
+    if baseline is not None:
+        lines.append(f"\nbaseline: commit {baseline.get('commit')}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "paths",
+        nargs="*",
+        default=[DEFAULT_INSTANCES],
+        help="puzzle files or directories (default: the benchmarks directory)",
+    )
+    parser.add_argument(
+        "--methods",
+        default=",".join(DEFAULT_METHODS),
+        help="comma-separated methods of bruteforce.solve",
+    )
+    parser.add_argument(
+        "--pattern-db",
+        metavar="DIRECTORY",
+        help="use the pattern databases built by patterndb.py in DIRECTORY",
+    )
+    parser.add_argument("--time-limit", type=float, help="seconds per run")
+    parser.add_argument("--repeat", type=int, default=1, help="timed runs per puzzle")
+    parser.add_argument(
+        "--no-memory", action="store_true", help="skip measuring the peak memory"
+    )
+    parser.add_argument("--output", help="save the results to this JSON file")
+    parser.add_argument("--compare", help="JSON file saved by an earlier run")
+    args = parser.parse_args()
+    methods = args.methods.split(",")
+    for method in methods:
+        if method not in bruteforce.METHODS:
+            parser.error(f"unknown method {method!r}")
+    report = run_benchmark(
+        args.paths,
+        methods,
+        args.pattern_db,
+        args.time_limit,
+        args.repeat,
+        not args.no_memory,
+    )
+    if args.output:
+        with open(args.output, "wt") as outfile:
+            json.dump(report, outfile, indent=2)
+    baseline = None
+    if args.compare:
+        with open(args.compare, "rt") as infile:
+            baseline = json.load(infile)
+    print(summarize(report, baseline))
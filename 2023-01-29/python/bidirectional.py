@@ -0,0 +1,99 @@
+"""Solve a 15 puzzle by breadth-first search from both ends."""
+
+from __future__ import annotations
+
+from sys import argv
+from typing import Final
+
+from fifteenpuzzle import (as_puzzle_input, read_arrangement, scramble,
+                           valid_permutation)
+from integerpermutations import IDENTITY, IntegerPermutation
+from packedboard import (GOAL, GOAL_BLANK, MOVE_BY_DIRECTION, OPPOSITE, pack,
+                         replay, successors)
+
+# Each side of the search stores the states it has reached in a dict mapping
+# the packed state to the index of the last move in DIRECTIONS (or -1 for the
+# state the side started from). The previous state is recovered by undoing
+# that move, so no states or routes are stored besides the keys themselves.
+
+DIRECTIONS: Final[str] = "udlr"
+
+DIRECTION_INDEX: Final[dict[str, int]] = {d: k for k, d in enumerate(DIRECTIONS)}
+
+
+def _trace(visited: dict[int, int], state: int, blank: int) -> str:
+    """Return the moves that reached ``state`` from where its side started."""
+    moves: list[str] = []
+    while (last := visited[state]) != -1:
+        direction = DIRECTIONS[last]
+        moves.append(direction)
+        new_blank, shift, new_shift = MOVE_BY_DIRECTION[blank][OPPOSITE[direction]]
+        swap = ((state >> new_shift) & 15) ^ 15
+        state ^= (swap << shift) ^ (swap << new_shift)
+        blank = new_blank
+    moves.reverse()
+    return "".join(moves)
+
+
+def _expand(
+    layer: list[tuple[int, int]],
+    visited: dict[int, int],
+    other: dict[int, int],
+) -> tuple[list[tuple[int, int]], list[tuple[int, int]]]:
+    """
+    Expand one layer of a side of the search.
+
+    Return the next layer and the new states that the other side has reached.
+    """
+    next_layer: list[tuple[int, int]] = []
+    meetings: list[tuple[int, int]] = []
+    for state, blank in layer:
+        for direction, _, new_state, new_blank in successors(state, blank):
+            if new_state not in visited:
+                visited[new_state] = DIRECTION_INDEX[direction]
+                next_layer.append((new_state, new_blank))
+                if new_state in other:
+                    meetings.append((new_state, new_blank))
+    return next_layer, meetings
+
+
+def solve(puzzle: IntegerPermutation) -> tuple[str, list[int]]:
+    """
+    Solve the puzzle with a bidirectional breadth-first search.
+
+    The smaller of the two frontiers is expanded a whole layer at a time, and
+    the search stops at the first layer that reaches the other side, so the
+    returned list of moves is as short as possible.
+    """
+    if not valid_permutation(puzzle):
+        raise ValueError("Not a valid puzzle layout.")
+    start, start_blank = pack(puzzle)
+    forward: dict[int, int] = {start: -1}
+    backward: dict[int, int] = {GOAL: -1}
+    forward_layer = [(start, start_blank)]
+    backward_layer = [(GOAL, GOAL_BLANK)]
+    meetings = [(start, start_blank)] if start == GOAL else []
+    while not meetings:
+        if len(forward_layer) <= len(backward_layer):
+            forward_layer, meetings = _expand(forward_layer, forward, backward)
+        else:
+            backward_layer, meetings = _expand(backward_layer, backward, forward)
+    # Every meeting found in the same layer gives a route of the same length.
+    state, blank = meetings[0]
+    to_goal = _trace(backward, state, blank)
+    moves = _trace(forward, state, blank) + "".join(
+        OPPOSITE[k] for k in reversed(to_goal)
+    )
+    return moves, replay(start, start_blank, moves)[2]
+
+
+if __name__ == "__main__":
+    if len(argv) > 1:
+        with open(argv[1], "rt") as infile:
+            puzzle = read_arrangement(infile.read())
+    else:
+        puzzle = scramble(IDENTITY)
+
+    print(as_puzzle_input(puzzle))
+    print("\n---\n")
+    print("\n".join(str(k) for k in solve(puzzle)[1]))
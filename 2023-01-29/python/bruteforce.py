@@ -3,13 +3,26 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
-from sys import argv
+import sys
+from argparse import ArgumentParser
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, field
+from heapq import heappop, heappush, nlargest
+from itertools import count
+from typing import Final
 
-from fifteenpuzzle import (as_puzzle_input, possible_next_moves,
-                           read_arrangement, scramble, tile_to_move,
+import anytime
+import bidirectional
+import idastar
+import parallelsolve
+import patterndb
+from fifteenpuzzle import (as_puzzle_input, read_arrangement, scramble,
                            valid_permutation)
+from instrumentation import Instrumentation, print_progress
 from integerpermutations import IDENTITY, IntegerPermutation
+from packedboard import (GOAL, NEIGHBORS, blank_position, pack, replay,
+                         successors, to_board)
+from patterndb import AdditiveHeuristic
 
 
 def position_coordinates(val: int) -> tuple[int, int]:
@@ -26,75 +39,322 @@ def manhattan_distance(a: int, b: int) -> int:
     return abs(ax - bx) + abs(ay - by)
 
 
+# A search with a memory budget gives up after this many evictions in a row with
+# nothing stored that had not been forgotten before.
+MAX_STALLED_EVICTIONS: Final[int] = 1_000
+
+
 # Not sure the best metric
 def score(arr: IntegerPermutation) -> int:
     """Evaluate how close the puzzle is to solved."""
     return sum(manhattan_distance((~arr)(k), k) for k in range(1, 17))
 
 
-@dataclass
+def board_score(board: list[int]) -> int:
+    """Evaluate how close a board (as used in ``idastar``) is to solved."""
+    return sum(idastar.MANHATTAN[tile][pos] for pos, tile in enumerate(board))
+
+
+@dataclass(slots=True)
 class PositionData:
-    """Store information about an arrangement."""
+    """
+    Store information about an arrangement.
+
+    Only the arrangement it was reached from (``parent``) and the move made
+    from there are kept; the route is rebuilt by following the parents.
+    """
 
     score: int
-    adjacent: dict[str, tuple[IntegerPermutation, int]]
-    shortest_route: tuple[str, list[int]]
-    exhausted: bool
-
-    @classmethod
-    def from_perm(
-        cls: type[PositionData],
-        perm: IntegerPermutation,
-        route: tuple[str, list[int]] | None = None,
-    ) -> PositionData:
-        """Make a PositionData object from an arrangement."""
-        if route is None:
-            route = ("", [])
-        return cls(
-            score(perm),
-            {
-                key[0]: (perm @ value, tile_to_move(perm, key[0]))
-                for key, value in possible_next_moves(perm).items()
-            },
-            route,
-            False,
-        )
+    blank: int
+    parent: int | None
+    move: str
+    depth: int
+    exhausted: bool = False
+    children: int = 0
+
+
+@dataclass
+class BestFirstSearch:
+    """
+    Store the state of a greedy best-first search over packed states.
+
+    If ``max_states`` is given, whenever more arrangements than that are
+    stored, the least promising ones with nothing reached from them are
+    forgotten (in the spirit of SMA*). An arrangement whose unexplored
+    neighbors were forgotten is reopened, with the best of their scores, so
+    that they are regenerated if they become the most promising again. The
+    budget has to leave room for the route being followed, or the search can
+    keep forgetting and regenerating the same arrangements; when
+    ``MAX_STALLED_EVICTIONS`` evictions in a row follow nothing but such
+    regenerations, ``idastar.SearchLimitReached`` is raised. Only the packed
+    states of forgotten arrangements are remembered for this.
+    """
+
+    start: int
+    evaluate: Callable[[list[int]], int] = board_score
+    max_states: int | None = None
+    instrumentation: Instrumentation | None = None
+    data: dict[int, PositionData] = field(default_factory=dict)
+    frontier: list[tuple[int, int, int]] = field(default_factory=list)
+    _counter: Iterator[int] = field(default_factory=count)
+    _forgotten: set[int] = field(default_factory=set)
+    _new_states: int = 0
+    _stalled: int = 0
+
+    def __post_init__(self: BestFirstSearch) -> None:
+        """Store the starting arrangement."""
+        self.add(self.start, blank_position(self.start), None, "", 0)
+
+    def add(
+        self: BestFirstSearch,
+        state: int,
+        blank: int,
+        parent: int | None,
+        move: str,
+        depth: int,
+    ) -> None:
+        """Store a newly reached arrangement and put it on the frontier."""
+        if self.instrumentation is None:
+            score = self.evaluate(to_board(state))
+        else:
+            score = self.instrumentation.time_call(self.evaluate, to_board(state))
+        position = PositionData(score, blank, parent, move, depth)
+        if state not in self._forgotten:
+            self._new_states += 1
+        self.data[state] = position
+        if parent is not None:
+            self.data[parent].children += 1
+        self.push(state)
+
+    def push(self: BestFirstSearch, state: int) -> None:
+        """Put an arrangement on the frontier with its current score."""
+        heappush(self.frontier, (self.data[state].score, next(self._counter), state))
+
+    def pop(self: BestFirstSearch) -> int:
+        """Return the best-scoring unexhausted arrangement."""
+        while True:
+            score, _, state = heappop(self.frontier)
+            position = self.data.get(state)
+            if position is not None and not position.exhausted:
+                if position.score == score:
+                    return state
+
+    def step(self: BestFirstSearch) -> None:
+        """Perform one iteration of my brute-force algorithm."""
+        state = self.pop()
+        position = self.data[state]
+        num_stored = len(self.data)
+        for direction, _, new_state, new_blank in successors(state, position.blank):
+            if new_state not in self.data:
+                self.add(new_state, new_blank, state, direction, position.depth + 1)
+            elif position.depth + 1 < (old := self.data[new_state]).depth:
+                if old.parent is not None:
+                    self.data[old.parent].children -= 1
+                position.children += 1
+                old.parent = state
+                old.move = direction
+                old.depth = position.depth + 1
+        position.exhausted = True
+        if self.instrumentation is not None:
+            self.count(len(NEIGHBORS[position.blank]), len(self.data) - num_stored)
+        if self.max_states is not None and len(self.data) > self.max_states:
+            self.evict(len(self.data) - self.max_states + self.max_states // 10)
+
+    def count(self: BestFirstSearch, generated: int, added: int) -> None:
+        """Update the statistics after expanding an arrangement."""
+        stats = self.instrumentation.stats
+        stats.nodes_expanded += 1
+        stats.nodes_generated += generated
+        stats.duplicate_hits += generated - added
+        stats.frontier_size = len(self.frontier)
+        stats.closed_size = len(self.data)
+        if stats.nodes_expanded % idastar.CHECK_INTERVAL == 0:
+            self.instrumentation.tick()
 
+    def evict(self: BestFirstSearch, num_states: int) -> None:
+        """
+        Forget up to ``num_states`` of the worst-scoring leaf arrangements.
 
-def min_score(data: dict[IntegerPermutation, PositionData]) -> IntegerPermutation:
-    """Return the best-scoring permutation explored so far."""
-    return min(
-        (perm for perm in data.keys() if not data[perm].exhausted),
-        key=lambda perm: data[perm].score,
+        :raises idastar.SearchLimitReached: If too many evictions in a row had
+            only regenerated forgotten arrangements to free.
+        """
+        if self._new_states:
+            self._stalled = 0
+        else:
+            self._stalled += 1
+            if self._stalled >= MAX_STALLED_EVICTIONS:
+                raise idastar.SearchLimitReached(
+                    f"No progress within {self.max_states} arrangements"
+                )
+        self._new_states = 0
+        leaves = [
+            state
+            for state, position in self.data.items()
+            if position.children == 0 and state != self.start
+        ]
+        for state in nlargest(num_states, leaves, key=lambda s: self.data[s].score):
+            position = self.data.pop(state)
+            self._forgotten.add(state)
+            parent = self.data[position.parent]
+            parent.children -= 1
+            if not position.exhausted:
+                if parent.exhausted or position.score < parent.score:
+                    parent.score = position.score
+                parent.exhausted = False
+                self.push(position.parent)
+
+    def route(self: BestFirstSearch, state: int) -> tuple[str, list[int]]:
+        """Rebuild the route from the start to a stored arrangement."""
+        moves: list[str] = []
+        while (position := self.data[state]).parent is not None:
+            moves.append(position.move)
+            state = position.parent
+        route = "".join(reversed(moves))
+        return route, replay(self.start, self.data[self.start].blank, route)[2]
+
+
+def best_first(
+    puzzle: IntegerPermutation,
+    heuristic: AdditiveHeuristic | None = None,
+    max_states: int | None = None,
+    instrumentation: Instrumentation | None = None,
+) -> tuple[str, list[int]]:
+    """
+    Solve the puzzle by greedy best-first search and return the list of moves.
+
+    :param heuristic: Pattern databases from ``patterndb.load`` to use in place
+        of the Manhattan distance, if any.
+    :param max_states: The most arrangements to keep in memory at once.
+    :raises idastar.SearchLimitReached: If the route cannot be found within
+        ``max_states`` arrangements.
+    :param instrumentation: Collects statistics and reports progress, if given.
+    """
+    search = BestFirstSearch(
+        pack(puzzle)[0],
+        board_score if heuristic is None else heuristic.from_board,
+        max_states,
+        instrumentation,
     )
+    if instrumentation is None:
+        while GOAL not in search.data:
+            search.step()
+    else:
+        with instrumentation.capture():
+            while GOAL not in search.data:
+                search.step()
+    return search.route(GOAL)
 
 
-def step(data: dict[IntegerPermutation, PositionData]):
-    """Perform one iteration of my brute-force algorithm, modifying data in-place."""
-    next_perm = min_score(data)
-    for direction, (perm, tile) in data[next_perm].adjacent.items():
-        new_route = (
-            data[next_perm].shortest_route[0] + direction,
-            data[next_perm].shortest_route[1] + [tile],
-        )
-        if perm not in data:
-            data[perm] = PositionData.from_perm(perm, new_route)
-        elif len(new_route[0]) < len(data[perm].shortest_route[0]):
-            data[perm].shortest_route = new_route
-    data[next_perm].exhausted = True
+METHODS: Final[dict[str, Callable[..., tuple[str, list[int]]]]] = {
+    "best-first": best_first,
+    "ida*": idastar.solve,
+    "bidirectional": bidirectional.solve,
+    "parallel": parallelsolve.solve,
+    "anytime": anytime.solve,
+}
+
+
+# The keyword options that each method's solver takes.
+OPTIONS: Final[dict[str, frozenset[str]]] = {
+    "best-first": frozenset({"heuristic", "max_states", "instrumentation"}),
+    "ida*": frozenset({"heuristic", "max_nodes", "time_limit", "instrumentation"}),
+    "bidirectional": frozenset(),
+    "parallel": frozenset({"heuristic", "workers"}),
+    "anytime": frozenset({"heuristic", "time_budget", "node_budget", "weights"}),
+}
+
 
+def solve(
+    puzzle: IntegerPermutation, method: str = "best-first", **options
+) -> tuple[str, list[int]]:
+    """
+    Solve the puzzle and return the list of moves.
 
-def solve(puzzle: IntegerPermutation) -> tuple[str, list[int]]:
-    """Solve the puzzle and return the list of moves."""
-    data = {puzzle: PositionData.from_perm(puzzle)}
-    while IDENTITY not in data:
-        step(data)
-    return data[IDENTITY].shortest_route
+    :param method: One of the keys of ``METHODS``. ``"best-first"`` finds a
+        solution quickly but not necessarily a short one; ``"ida*"`` finds an
+        optimal solution using memory linear in its length; ``"bidirectional"``
+        finds an optimal solution by searching from both ends, which is fast
+        for scrambles of medium depth but stores every state it reaches;
+        ``"parallel"`` runs IDA* over a pool of ``workers`` processes;
+        ``"anytime"`` runs weighted A* passes with smaller and smaller weights
+        until ``time_budget`` seconds or ``node_budget`` nodes are used up, and
+        returns an ``anytime.AnytimeRoute``, whose ``bound`` attribute says how
+        far from optimal the route can be.
+    :param options: Passed on to the solver for ``method``; ``OPTIONS`` lists
+        the ones each takes. Every method but ``"bidirectional"`` takes a
+        ``heuristic``, such as the pattern databases from ``patterndb.load``.
+        ``"best-first"`` takes ``max_states``, a cap on stored arrangements,
+        and ``"ida*"`` takes ``max_nodes`` and ``time_limit``. Only
+        ``"best-first"`` and ``"ida*"`` take an
+        ``instrumentation.Instrumentation`` to collect statistics, report
+        progress and profile the search.
+    :raises ValueError: If the method is unknown or does not take an option.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown method {method!r}")
+    if unsupported := sorted(set(options) - OPTIONS[method]):
+        raise ValueError(f"Method {method!r} does not take {', '.join(unsupported)}")
+    return METHODS[method](puzzle, **options)
 
 
 if __name__ == "__main__":
-    if len(argv) > 1:
-        with open(argv[1], "rt") as infile:
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("filename", nargs="?", help="file with the puzzle layout")
+    parser.add_argument("--method", choices=list(METHODS), default="best-first")
+    parser.add_argument(
+        "--pattern-db",
+        metavar="DIRECTORY",
+        help="use the pattern databases built by patterndb.py in DIRECTORY",
+    )
+    parser.add_argument(
+        "--max-states",
+        type=int,
+        help="keep at most this many arrangements in memory (best-first only)",
+    )
+    parser.add_argument(
+        "--progress", action="store_true", help="print statistics every second"
+    )
+    parser.add_argument(
+        "--profile", action="store_true", help="print the top cProfile entries"
+    )
+    parser.add_argument(
+        "--trace-memory", action="store_true", help="print the peak memory use"
+    )
+    parser.add_argument(
+        "--time-budget", type=float, help="seconds to search for (anytime only)"
+    )
+    parser.add_argument(
+        "--node-budget", type=int, help="nodes to expand (anytime only)"
+    )
+    args = parser.parse_args()
+    options = {}
+    for key in ["time_budget", "node_budget"]:
+        if getattr(args, key) is not None:
+            options[key] = getattr(args, key)
+    instrumentation = None
+    if args.progress or args.profile or args.trace_memory:
+        instrumentation = Instrumentation(
+            progress=print_progress if args.progress else None,
+            profile=args.profile,
+            trace_memory=args.trace_memory,
+        )
+        options["instrumentation"] = instrumentation
+    if args.max_states is not None:
+        options["max_states"] = args.max_states
+    if args.pattern_db is not None:
+        options["heuristic"] = patterndb.load(directory=args.pattern_db)
+    flags = {
+        "time_budget": "--time-budget",
+        "node_budget": "--node-budget",
+        "instrumentation": "--progress, --profile and --trace-memory",
+        "max_states": "--max-states",
+        "heuristic": "--pattern-db",
+    }
+    for key in options:
+        if key not in OPTIONS[args.method]:
+            parser.error(f"{flags[key]} cannot be used with --method {args.method}")
+    if args.filename is not None:
+        with open(args.filename, "rt") as infile:
             puzzle = read_arrangement(infile.read())
     else:
         puzzle = scramble(IDENTITY)
@@ -103,4 +363,15 @@ if __name__ == "__main__":
         raise ValueError("Not a valid puzzle layout.")
     print(as_puzzle_input(puzzle))
     print("\n---\n")
-    print("\n".join(str(k) for k in solve(puzzle)[1]))
+    solution = solve(puzzle, args.method, **options)
+    print("\n".join(str(k) for k in solution[1]))
+    if isinstance(solution, anytime.AnytimeRoute):
+        print(
+            f"{len(solution[0])} moves, at most {solution.bound:.3f} times optimal",
+            file=sys.stderr,
+        )
+    if instrumentation is not None:
+        print(instrumentation.stats.summary(), file=sys.stderr)
+        if instrumentation.profile_stats is not None:
+            instrumentation.profile_stats.stream = sys.stderr
+            instrumentation.profile_stats.sort_stats("cumulative").print_stats(20)
@@ -0,0 +1,108 @@
+"""Generate collections of 15 puzzles for benchmarks and cross-checks."""
+
+from __future__ import annotations
+
+import os
+from argparse import ArgumentParser
+from collections.abc import Iterable, Iterator
+from random import Random
+
+from packedboard import (BLANK, GOAL, GOAL_BLANK, MOVES, OPPOSITE, from_board,
+                         is_solvable, to_text)
+
+# Puzzles are packed states (see ``packedboard``) paired with the position of
+# the empty square. A corpus is written either as one file with the puzzles
+# separated by blank lines (as read by ``batch.py``), or as a directory with
+# one puzzle per file (as read by ``bruteforce.py`` and the Rust solver).
+
+
+def random_walk(depth: int, rng: Random) -> tuple[int, int]:
+    """
+    Make exactly ``depth`` random moves from the solved puzzle.
+
+    No move undoes the one before it, so the puzzle usually (though not
+    always) takes close to ``depth`` moves to solve.
+    """
+    state, blank = GOAL, GOAL_BLANK
+    prev = ""
+    for _ in range(depth):
+        moves = [k for k in MOVES[blank] if k[0] != OPPOSITE[prev]]
+        prev, new_blank, shift, new_shift = moves[rng.randrange(len(moves))]
+        swap = ((state >> new_shift) & 15) ^ BLANK
+        state ^= (swap << shift) ^ (swap << new_shift)
+        blank = new_blank
+    return state, blank
+
+
+def random_solvable(rng: Random) -> tuple[int, int]:
+    """
+    Pick a solvable arrangement uniformly at random.
+
+    A shuffle that cannot be solved is fixed by swapping the first two tiles
+    (other than the empty square). This pairs every unsolvable arrangement with
+    exactly one solvable arrangement, so each solvable one is equally likely.
+    """
+    board = list(range(16))
+    rng.shuffle(board)
+    state, blank = from_board(board), board.index(BLANK)
+    if not is_solvable(state, blank):
+        first, second = [pos for pos in range(16) if pos != blank][:2]
+        board[first], board[second] = board[second], board[first]
+        state = from_board(board)
+    return state, blank
+
+
+def generate(
+    count: int, depth: int | None = None, seed: int | None = None
+) -> Iterator[tuple[int, int]]:
+    """Yield random walks of the given depth, or uniformly random puzzles."""
+    rng = Random(seed)
+    for _ in range(count):
+        yield random_solvable(rng) if depth is None else random_walk(depth, rng)
+
+
+def write_corpus(puzzles: Iterable[tuple[int, int]], filename: str) -> int:
+    """Write puzzles to one file, separated by blank lines, and return how many."""
+    num_puzzles = 0
+    with open(filename, "wt") as outfile:
+        for state, _ in puzzles:
+            if num_puzzles:
+                outfile.write("\n")
+            outfile.write(to_text(state) + "\n")
+            num_puzzles += 1
+    return num_puzzles
+
+
+def write_corpus_dir(
+    puzzles: Iterable[tuple[int, int]], directory: str, prefix: str = "puzzle_"
+) -> list[str]:
+    """Write puzzles to a directory, one to a file, and return the file names."""
+    os.makedirs(directory, exist_ok=True)
+    filenames: list[str] = []
+    for idx, (state, _) in enumerate(puzzles):
+        filename = os.path.join(directory, f"{prefix}{idx:06d}.txt")
+        with open(filename, "wt") as outfile:
+            outfile.write(to_text(state))
+        filenames.append(filename)
+    return filenames
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("output", help="file (or, with --split, directory) to write")
+    parser.add_argument("--count", type=int, default=100, help="number of puzzles")
+    parser.add_argument(
+        "--depth",
+        type=int,
+        help="make this many random moves (default: uniformly random puzzles)",
+    )
+    parser.add_argument("--seed", type=int, help="seed for reproducible corpora")
+    parser.add_argument(
+        "--split", action="store_true", help="write one puzzle per file"
+    )
+    args = parser.parse_args()
+    puzzles = generate(args.count, args.depth, args.seed)
+    if args.split:
+        write_corpus_dir(puzzles, args.output)
+    else:
+        write_corpus(puzzles, args.output)
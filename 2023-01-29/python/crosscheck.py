@@ -0,0 +1,221 @@
+"""Run the Rust and Python solvers side by side on many puzzles and compare them."""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+import tempfile
+from argparse import ArgumentParser
+from collections.abc import Sequence
+from math import ceil
+from time import perf_counter
+from typing import Final, NamedTuple
+
+from batch import read_puzzles
+from bruteforce import OPTIONS
+from corpus import generate
+from fifteenpuzzle import read_arrangement, valid_permutation
+from packedboard import GOAL, pack, replay_tiles, to_text
+from rust_test import RUST_COMMAND
+
+# Each solver is run as a subprocess on a puzzle file in a temporary directory,
+# with at most ``--jobs`` of them running at once. Solvers are named "rust" for
+# the Rust binary (built with ``cargo build --release``) or after a method of
+# ``bruteforce.solve``. Every route is checked by replaying it on the puzzle.
+
+BRUTEFORCE: Final[str] = os.path.join(os.path.dirname(__file__), "bruteforce.py")
+
+# ``RUST_COMMAND`` is relative to this directory, not the working directory.
+RUST_BINARY: Final[str] = os.path.normpath(
+    os.path.join(os.path.dirname(__file__), RUST_COMMAND)
+)
+
+DEFAULT_SOLVERS: Final[tuple[str, ...]] = ("rust", "ida*")
+
+PERCENTILES: Final[tuple[int, ...]] = (50, 90, 99)
+
+
+class Outcome(NamedTuple):
+    """How one solver did on one puzzle."""
+
+    solver: str
+    puzzle: str
+    status: str
+    seconds: float
+    length: int | None
+
+
+def solver_command(
+    solver: str, filename: str, pattern_db: str | None = None
+) -> list[str]:
+    """Return the command line that runs a solver on a puzzle file."""
+    if solver == "rust":
+        return [RUST_BINARY, filename]
+    command = [sys.executable, BRUTEFORCE, "--method", solver, filename]
+    if pattern_db is not None and "heuristic" in OPTIONS[solver]:
+        command += ["--pattern-db", pattern_db]
+    return command
+
+
+def parse_output(solver: str, output: str) -> list[int] | None:
+    """Read the tiles moved from a solver's output, or ``None`` if there are none."""
+    if solver == "rust":
+        if "Solution:" not in output:
+            return None
+        text = output.split("Solution:")[1]
+    else:
+        if "---" not in output:
+            return None
+        text = output.split("---")[1]
+    return [int(k) for k in text.replace(",", " ").split()]
+
+
+def check_route(text: str, tiles: Sequence[int]) -> bool:
+    """Return true if moving the tiles in turn solves the puzzle."""
+    try:
+        state, blank = replay_tiles(*pack(read_arrangement(text)), tiles)
+    except ValueError:
+        return False
+    return state == GOAL
+
+
+async def run_solver(
+    solver: str,
+    name: str,
+    filename: str,
+    text: str,
+    jobs: asyncio.Semaphore,
+    timeout: float | None = None,
+    pattern_db: str | None = None,
+) -> Outcome:
+    """Run a solver on one puzzle and check what it returns."""
+    async with jobs:
+        start_time = perf_counter()
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *solver_command(solver, filename, pattern_db),
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+            )
+        except OSError:
+            # A solver that cannot be started, such as an unbuilt Rust binary.
+            return Outcome(solver, name, "error", perf_counter() - start_time, None)
+        try:
+            stdout, _ = await asyncio.wait_for(proc.communicate(), timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            return Outcome(solver, name, "timeout", perf_counter() - start_time, None)
+        seconds = perf_counter() - start_time
+    tiles = parse_output(solver, stdout.decode())
+    if tiles is None:
+        solvable = valid_permutation(read_arrangement(text))
+        return Outcome(solver, name, "error" if solvable else "invalid", seconds, None)
+    if not check_route(text, tiles):
+        return Outcome(solver, name, "wrong", seconds, len(tiles))
+    return Outcome(solver, name, "ok", seconds, len(tiles))
+
+
+async def crosscheck(
+    puzzles: list[tuple[str, str]],
+    solvers: Sequence[str] = DEFAULT_SOLVERS,
+    jobs: int | None = None,
+    timeout: float | None = None,
+    pattern_db: str | None = None,
+) -> list[Outcome]:
+    """Run every solver on every puzzle, several at a time."""
+    semaphore = asyncio.Semaphore(jobs or os.cpu_count() or 1)
+    with tempfile.TemporaryDirectory() as directory:
+        tasks = []
+        for idx, (name, text) in enumerate(puzzles):
+            filename = os.path.join(directory, f"puzzle_{idx:06d}.txt")
+            with open(filename, "wt") as outfile:
+                outfile.write(text)
+            tasks.extend(
+                run_solver(
+                    solver, name, filename, text, semaphore, timeout, pattern_db
+                )
+                for solver in solvers
+            )
+        return await asyncio.gather(*tasks)
+
+
+def percentile(values: Sequence[float], pct: int) -> float:
+    """Return the nearest-rank percentile of some values."""
+    ordered = sorted(values)
+    return ordered[max(ceil(pct / 100 * len(ordered)) - 1, 0)]
+
+
+def report(outcomes: list[Outcome], solvers: Sequence[str]) -> str:
+    """Tabulate the solution lengths for each puzzle and the times for each solver."""
+    width = max(8, *(len(k) for k in solvers))
+    by_puzzle: dict[str, dict[str, Outcome]] = {}
+    for outcome in outcomes:
+        by_puzzle.setdefault(outcome.puzzle, {})[outcome.solver] = outcome
+    lines = ["puzzle".ljust(30) + "".join(k.rjust(width + 2) for k in solvers)]
+    for name, results in by_puzzle.items():
+        cells = []
+        for solver in solvers:
+            outcome = results[solver]
+            cells.append(
+                str(outcome.length) if outcome.status == "ok" else outcome.status
+            )
+        lengths = {results[k].length for k in solvers if results[k].status == "ok"}
+        mark = "  (lengths differ)" if len(lengths) > 1 else ""
+        lines.append(
+            name[-30:].ljust(30) + "".join(k.rjust(width + 2) for k in cells) + mark
+        )
+    lines.append("")
+    header = ["ok", "failed"] + [f"p{k} (s)" for k in PERCENTILES] + ["max (s)"]
+    lines.append("solver".ljust(width) + "".join(k.rjust(10) for k in header))
+    for solver in solvers:
+        results = [k for k in outcomes if k.solver == solver]
+        times = [k.seconds for k in results]
+        num_ok = sum(1 for k in results if k.status in ("ok", "invalid"))
+        row = [str(num_ok), str(len(results) - num_ok)]
+        row += [f"{percentile(times, k):.3f}" for k in PERCENTILES]
+        row.append(f"{max(times):.3f}")
+        lines.append(solver.ljust(width) + "".join(k.rjust(10) for k in row))
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "paths", nargs="*", help="puzzle files or directories (default: generate)"
+    )
+    parser.add_argument(
+        "--solvers",
+        default=",".join(DEFAULT_SOLVERS),
+        help='comma-separated solvers: "rust" or a bruteforce.py method',
+    )
+    parser.add_argument("--jobs", type=int, help="solvers to run at once")
+    parser.add_argument("--timeout", type=float, help="seconds per solver run")
+    parser.add_argument(
+        "--pattern-db",
+        metavar="DIRECTORY",
+        help="use the pattern databases built by patterndb.py in DIRECTORY",
+    )
+    parser.add_argument("--count", type=int, default=50, help="puzzles to generate")
+    parser.add_argument(
+        "--depth", type=int, default=20, help="random moves per generated puzzle"
+    )
+    parser.add_argument("--seed", type=int, help="seed for generated puzzles")
+    args = parser.parse_args()
+    solvers = args.solvers.split(",")
+    if args.paths:
+        puzzles = list(read_puzzles(args.paths))
+    else:
+        puzzles = [
+            (f"depth {args.depth} #{idx + 1}", to_text(state))
+            for idx, (state, _) in enumerate(
+                generate(args.count, args.depth, args.seed)
+            )
+        ]
+    outcomes = asyncio.run(
+        crosscheck(puzzles, solvers, args.jobs, args.timeout, args.pattern_db)
+    )
+    print(report(outcomes, solvers))
+    failed = [k for k in outcomes if k.status not in ("ok", "invalid")]
+    sys.exit(1 if failed else 0)
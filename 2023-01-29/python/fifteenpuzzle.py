@@ -1,6 +1,7 @@
 """Validate 15 puzzle arrangements."""
 
 
+import re
 from random import choice
 from sys import argv
 from typing import Final
@@ -36,6 +37,18 @@ def read_arrangement(text: str) -> IntegerPermutation:
     )
 
 
+def split_arrangements(text: str) -> list[str]:
+    """Split text holding several arrangements separated by blank lines."""
+    return [
+        " ".join(chunk.split()) for chunk in re.split(r"\n\s*\n", text) if chunk.strip()
+    ]
+
+
+def read_arrangements(text: str) -> list[IntegerPermutation]:
+    """Read several arrangements separated by blank lines."""
+    return [read_arrangement(chunk) for chunk in split_arrangements(text)]
+
+
 def manhattan_distance(x: int) -> int:
     """Return the Manhattan distance from square position x to position 16."""
     if x < 1 or x > 16:
@@ -0,0 +1,323 @@
+"""Solve a 15 puzzle with iterative-deepening A* (IDA*)."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from sys import argv
+from time import perf_counter
+from typing import TYPE_CHECKING, Final
+
+from fifteenpuzzle import (as_puzzle_input, read_arrangement, scramble,
+                           valid_permutation)
+from integerpermutations import IDENTITY, IntegerPermutation
+from packedboard import BLANK, NEIGHBORS, OPPOSITE
+
+if TYPE_CHECKING:
+    from instrumentation import Instrumentation
+    from patterndb import AdditiveHeuristic
+
+# Inside the search, a board is a list of 16 integers with ``board[pos]`` the
+# tile at (zero-indexed) position ``pos``. Tiles are zero-indexed as well, so
+# the solved board is ``[0, 1, ..., 15]`` and tile 15 is the empty square.
+
+FOUND: Final[int] = -1
+
+CHECK_INTERVAL: Final[int] = 4096
+
+MANHATTAN: Final[list[list[int]]] = [
+    # MANHATTAN[tile][pos] is the distance of ``tile`` at ``pos`` from its goal.
+    [0] * 16
+    if tile == BLANK
+    else [abs(tile // 4 - pos // 4) + abs(tile % 4 - pos % 4) for pos in range(16)]
+    for tile in range(16)
+]
+
+# A line (row or column) is encoded as four base-5 digits, one per square in
+# the line. The digit is the goal index within the line of the tile on that
+# square if the tile belongs in the line, and 4 otherwise.
+
+ROW_DIGIT: Final[list[list[int]]] = [
+    [tile % 4 if tile != BLANK and tile // 4 == row else 4 for row in range(4)]
+    for tile in range(16)
+]
+
+COL_DIGIT: Final[list[list[int]]] = [
+    [tile // 4 if tile != BLANK and tile % 4 == col else 4 for col in range(4)]
+    for tile in range(16)
+]
+
+
+def _line_conflicts(code: int) -> int:
+    """
+    Return the linear-conflict penalty for an encoded line.
+
+    Every tile that has to leave the line to let the others pass costs two
+    extra moves. The fewest such tiles is the number of tiles in the line
+    minus the longest run of them (in order) already in their goal order.
+    """
+    goals = [d for d in ((code // 5**k) % 5 for k in range(4)) if d != 4]
+    longest = [1] * len(goals)
+    for j in range(len(goals)):
+        for k in range(j):
+            if goals[k] < goals[j]:
+                longest[j] = max(longest[j], longest[k] + 1)
+    return 2 * (len(goals) - max(longest, default=0))
+
+
+LINE_CONFLICTS: Final[list[int]] = [_line_conflicts(code) for code in range(5**4)]
+
+
+def row_conflicts(board: list[int], row: int) -> int:
+    """Return the linear-conflict penalty of a row of the board."""
+    base = 4 * row
+    return LINE_CONFLICTS[
+        ROW_DIGIT[board[base]][row]
+        + 5 * ROW_DIGIT[board[base + 1]][row]
+        + 25 * ROW_DIGIT[board[base + 2]][row]
+        + 125 * ROW_DIGIT[board[base + 3]][row]
+    ]
+
+
+def col_conflicts(board: list[int], col: int) -> int:
+    """Return the linear-conflict penalty of a column of the board."""
+    return LINE_CONFLICTS[
+        COL_DIGIT[board[col]][col]
+        + 5 * COL_DIGIT[board[col + 4]][col]
+        + 25 * COL_DIGIT[board[col + 8]][col]
+        + 125 * COL_DIGIT[board[col + 12]][col]
+    ]
+
+
+def linear_conflict(board: list[int]) -> int:
+    """Return the Manhattan distance plus linear conflicts of the board."""
+    return (
+        sum(MANHATTAN[tile][pos] for pos, tile in enumerate(board))
+        + sum(row_conflicts(board, k) for k in range(4))
+        + sum(col_conflicts(board, k) for k in range(4))
+    )
+
+
+class SearchLimitReached(Exception):
+    """Raised when a search uses up its node or time budget."""
+
+
+def to_board(perm: IntegerPermutation) -> list[int]:
+    """Convert an arrangement (positions -> tiles) to a board."""
+    return [perm(pos) - 1 for pos in range(1, 17)]
+
+
+@dataclass
+class IDAStar:
+    """
+    Store the state of an IDA* search.
+
+    The board is modified in place while searching; the moves and tiles on the
+    current path are kept in ``moves`` and ``tiles``, so memory use is linear
+    in the depth of the solution. If ``heuristic`` is given, the larger of it
+    and the linear-conflict estimate is used.
+
+    If more than ``max_nodes`` nodes are expanded or the search runs for more
+    than ``time_limit`` seconds, ``SearchLimitReached`` is raised (and the
+    board is left wherever the search was). Statistics are kept in
+    ``instrumentation`` if it is given; the heuristic is updated inline, so
+    its cost only shows up in a profile.
+    """
+
+    board: list[int]
+    blank: int = field(init=False)
+    moves: list[str] = field(default_factory=list)
+    tiles: list[int] = field(default_factory=list)
+    nodes_expanded: int = 0
+    nodes_generated: int = 0
+    heuristic: AdditiveHeuristic | None = None
+    max_nodes: int | None = None
+    time_limit: float | None = None
+    instrumentation: Instrumentation | None = None
+
+    def __post_init__(self: IDAStar) -> None:
+        """Locate the empty square and look up the pattern databases."""
+        self.blank = self.board.index(BLANK)
+        self._deadline = None
+        if self.time_limit is not None:
+            self._deadline = perf_counter() + self.time_limit
+        self._next_check = self._check_after()
+        self._where = [0] * 16
+        for pos, tile in enumerate(self.board):
+            self._where[tile] = pos
+        if self.heuristic is None:
+            self._pattern_of = [-1] * 16
+            self._pattern_values = []
+        else:
+            self._pattern_of = self.heuristic.pattern_of
+            self._pattern_values = [
+                database.lookup(self._where) for database in self.heuristic.databases
+            ]
+
+    def search(self: IDAStar, g: int, h: int, p: int, bound: int, prev: str) -> int:
+        """
+        Search below the current board for a solution within ``bound`` moves.
+
+        ``h`` is the linear-conflict estimate of the board and ``p`` the pattern
+        database estimate (0 if there is none). Return ``FOUND`` if a solution
+        was found, and otherwise the smallest estimated solution length that
+        exceeded the bound.
+        """
+        f = g + (h if h > p else p)
+        if f > bound:
+            return f
+        if h == 0:
+            return FOUND
+        self.nodes_expanded += 1
+        if self.nodes_expanded >= self._next_check:
+            self.check_limits()
+        board = self.board
+        blank = self.blank
+        self.nodes_generated += len(NEIGHBORS[blank]) - (prev != "")
+        smallest = 1_000
+        for direction, new_blank in NEIGHBORS[blank]:
+            if direction == OPPOSITE[prev]:
+                continue
+            tile = board[new_blank]
+            if direction in "ud":
+                old_conflicts = row_conflicts(board, blank // 4) + row_conflicts(
+                    board, new_blank // 4
+                )
+            else:
+                old_conflicts = col_conflicts(board, blank % 4) + col_conflicts(
+                    board, new_blank % 4
+                )
+            board[blank] = tile
+            board[new_blank] = BLANK
+            if direction in "ud":
+                new_conflicts = row_conflicts(board, blank // 4) + row_conflicts(
+                    board, new_blank // 4
+                )
+            else:
+                new_conflicts = col_conflicts(board, blank % 4) + col_conflicts(
+                    board, new_blank % 4
+                )
+            new_h = (
+                h
+                + MANHATTAN[tile][blank]
+                - MANHATTAN[tile][new_blank]
+                + new_conflicts
+                - old_conflicts
+            )
+            new_p = p
+            group = self._pattern_of[tile]
+            if group >= 0:
+                self._where[tile] = blank
+                old_value = self._pattern_values[group]
+                new_value = self.heuristic.databases[group].lookup(self._where)
+                self._pattern_values[group] = new_value
+                new_p += new_value - old_value
+            self.blank = new_blank
+            self.moves.append(direction)
+            self.tiles.append(tile + 1)
+            result = self.search(g + 1, new_h, new_p, bound, direction)
+            if result == FOUND:
+                return FOUND
+            smallest = min(smallest, result)
+            self.moves.pop()
+            self.tiles.pop()
+            self.blank = blank
+            board[new_blank] = tile
+            board[blank] = BLANK
+            if group >= 0:
+                self._where[tile] = new_blank
+                self._pattern_values[group] = old_value
+        return smallest
+
+    def _check_after(self: IDAStar) -> int:
+        """Return the node count at which the limits are next checked."""
+        if self._deadline is not None or self.instrumentation is not None:
+            next_check = self.nodes_expanded + CHECK_INTERVAL
+        else:
+            next_check = 1 << 62
+        if self.max_nodes is not None:
+            next_check = min(next_check, self.max_nodes + 1)
+        return next_check
+
+    def check_limits(self: IDAStar) -> None:
+        """Report progress, and raise ``SearchLimitReached`` if out of budget."""
+        if self.instrumentation is not None:
+            self.update_stats()
+            self.instrumentation.tick()
+        if self.max_nodes is not None and self.nodes_expanded > self.max_nodes:
+            raise SearchLimitReached(f"Expanded more than {self.max_nodes} nodes")
+        if self._deadline is not None and perf_counter() > self._deadline:
+            raise SearchLimitReached(f"Ran for more than {self.time_limit} seconds")
+        self._next_check = self._check_after()
+
+    def update_stats(self: IDAStar) -> None:
+        """Copy the counters into the instrumentation's stats."""
+        if self.instrumentation is not None:
+            stats = self.instrumentation.stats
+            stats.nodes_expanded = self.nodes_expanded
+            stats.nodes_generated = self.nodes_generated
+            stats.frontier_size = len(self.moves)
+
+    def estimate(self: IDAStar) -> int:
+        """Return the estimated number of moves left from the current board."""
+        return max(linear_conflict(self.board), sum(self._pattern_values))
+
+    def search_from(self: IDAStar, g: int, bound: int, prev: str = "") -> int:
+        """Run ``search`` on the current board, reached after ``g`` moves."""
+        if self.instrumentation is not None:
+            self.instrumentation.stats.bound = bound
+        return self.search(
+            g, linear_conflict(self.board), sum(self._pattern_values), bound, prev
+        )
+
+    def run(self: IDAStar) -> tuple[str, list[int]]:
+        """Deepen the bound until a solution is found and return it."""
+        bound = self.estimate()
+        while (bound := self.search_from(0, bound)) != FOUND:
+            pass
+        return "".join(self.moves), self.tiles
+
+
+def solve(
+    puzzle: IntegerPermutation,
+    heuristic: AdditiveHeuristic | None = None,
+    max_nodes: int | None = None,
+    time_limit: float | None = None,
+    instrumentation: Instrumentation | None = None,
+) -> tuple[str, list[int]]:
+    """
+    Solve the puzzle with IDA* and return an optimal list of moves.
+
+    :param heuristic: Pattern databases from ``patterndb.load``, if any.
+    :param max_nodes: Give up (with ``SearchLimitReached``) after expanding
+        this many nodes.
+    :param time_limit: Give up after this many seconds.
+    :param instrumentation: Collects statistics and reports progress, if given.
+    """
+    if not valid_permutation(puzzle):
+        raise ValueError("Not a valid puzzle layout.")
+    search = IDAStar(
+        to_board(puzzle),
+        heuristic=heuristic,
+        max_nodes=max_nodes,
+        time_limit=time_limit,
+        instrumentation=instrumentation,
+    )
+    if instrumentation is None:
+        return search.run()
+    try:
+        with instrumentation.capture():
+            return search.run()
+    finally:
+        search.update_stats()
+
+
+if __name__ == "__main__":
+    if len(argv) > 1:
+        with open(argv[1], "rt") as infile:
+            puzzle = read_arrangement(infile.read())
+    else:
+        puzzle = scramble(IDENTITY)
+
+    print(as_puzzle_input(puzzle))
+    print("\n---\n")
+    print("\n".join(str(k) for k in solve(puzzle)[1]))
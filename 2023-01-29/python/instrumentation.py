@@ -0,0 +1,112 @@
+"""Collect statistics from the 15 puzzle solvers while they run."""
+
+from __future__ import annotations
+
+import cProfile
+import pstats
+import sys
+import tracemalloc
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from time import perf_counter
+
+# The solvers take an ``Instrumentation`` (or ``None``, the default, in which
+# case they do no extra work). They keep the counters in its ``stats`` up to
+# date, and call ``tick`` every few thousand nodes, which hands the stats to the
+# progress callback at most once per ``interval`` seconds. The callback may
+# raise an exception (such as ``idastar.SearchLimitReached``) to stop a search.
+
+
+@dataclass
+class SearchStats:
+    """Counters describing a search so far."""
+
+    nodes_expanded: int = 0
+    nodes_generated: int = 0
+    duplicate_hits: int = 0
+    frontier_size: int = 0
+    closed_size: int = 0
+    bound: int | None = None
+    heuristic_calls: int = 0
+    heuristic_seconds: float = 0.0
+    elapsed_seconds: float = 0.0
+    peak_memory: int | None = None
+
+    def summary(self: SearchStats) -> str:
+        """Describe the counters on one line."""
+        return ", ".join(
+            f"{key.replace('_', ' ')}: {value:,}"
+            if isinstance(value, int)
+            else f"{key.replace('_', ' ')}: {value:.3f}"
+            for key, value in vars(self).items()
+            if value is not None
+        )
+
+
+def print_progress(stats: SearchStats) -> None:
+    """Print the stats to standard error (the default progress callback)."""
+    print(stats.summary(), file=sys.stderr)
+
+
+@dataclass
+class Instrumentation:
+    """
+    Statistics, progress reports and optional profiles for one search.
+
+    :param progress: Called with the stats at most every ``interval`` seconds.
+    :param profile: Run the search under cProfile, keeping ``profile_stats``.
+    :param trace_memory: Trace allocations with tracemalloc, keeping the peak
+        in ``stats.peak_memory`` (this slows the search down considerably).
+    """
+
+    progress: Callable[[SearchStats], None] | None = print_progress
+    interval: float = 1.0
+    profile: bool = False
+    trace_memory: bool = False
+    stats: SearchStats = field(default_factory=SearchStats)
+    profile_stats: pstats.Stats | None = None
+    _start: float = field(init=False, default=0.0)
+    _next_report: float = field(init=False, default=0.0)
+
+    def __post_init__(self: Instrumentation) -> None:
+        """Schedule the first progress report."""
+        self._start = perf_counter()
+        self._next_report = self._start + self.interval
+
+    def tick(self: Instrumentation) -> None:
+        """Report progress if it is time to."""
+        now = perf_counter()
+        self.stats.elapsed_seconds = now - self._start
+        if self.progress is not None and now >= self._next_report:
+            self._next_report = now + self.interval
+            self.progress(self.stats)
+
+    def time_call(self: Instrumentation, func: Callable[..., int], *args) -> int:
+        """Call a heuristic, adding the time taken to the stats."""
+        start = perf_counter()
+        ret_val = func(*args)
+        self.stats.heuristic_seconds += perf_counter() - start
+        self.stats.heuristic_calls += 1
+        return ret_val
+
+    @contextmanager
+    def capture(self: Instrumentation) -> Iterator[None]:
+        """Run the body under the profilers asked for, and time it."""
+        profiler = cProfile.Profile() if self.profile else None
+        if self.trace_memory:
+            tracemalloc.start()
+        self._start = perf_counter()
+        self._next_report = self._start + self.interval
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                self.profile_stats = pstats.Stats(profiler)
+            if self.trace_memory:
+                self.stats.peak_memory = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            self.stats.elapsed_seconds = perf_counter() - self._start
@@ -0,0 +1,169 @@
+"""Represent 15 puzzle arrangements as 64-bit integers."""
+
+from __future__ import annotations
+
+from collections.abc import Iterator, Sequence
+from typing import Final
+
+from integerpermutations import IntegerPermutation
+
+# A packed state holds the (zero-indexed) tile at position ``pos`` in bits
+# ``4 * pos`` to ``4 * pos + 3``. Positions are zero-indexed as well, so tile 15
+# is the empty square and the solved puzzle has every tile equal to its
+# position. Since the empty square is needed for every move, it is tracked
+# alongside the state rather than searched for.
+
+BLANK: Final[int] = 15
+
+GOAL: Final[int] = sum(pos << (4 * pos) for pos in range(16))
+
+GOAL_BLANK: Final[int] = 15
+
+OPPOSITE: Final[dict[str, str]] = {"u": "d", "d": "u", "l": "r", "r": "l", "": ""}
+
+NEIGHBORS: Final[list[list[tuple[str, int]]]] = [
+    # For each position of the empty square, the directions it can move in
+    # (named as in ``fifteenpuzzle.possible_next_moves``) and where it ends up.
+    [
+        (direction, new_pos)
+        for direction, new_pos, allowed in [
+            ("u", pos - 4, pos > 3),
+            ("d", pos + 4, pos < 12),
+            ("r", pos + 1, pos % 4 != 3),
+            ("l", pos - 1, pos % 4 != 0),
+        ]
+        if allowed
+    ]
+    for pos in range(16)
+]
+
+MOVES: Final[list[tuple[tuple[str, int, int, int], ...]]] = [
+    # NEIGHBORS with the bit offsets of the two squares that swap.
+    tuple(
+        (direction, new_pos, 4 * pos, 4 * new_pos)
+        for direction, new_pos in NEIGHBORS[pos]
+    )
+    for pos in range(16)
+]
+
+MOVE_BY_DIRECTION: Final[list[dict[str, tuple[int, int, int]]]] = [
+    {
+        direction: (new_pos, shift, new_shift)
+        for direction, new_pos, shift, new_shift in moves
+    }
+    for moves in MOVES
+]
+
+
+def from_board(board: Sequence[int]) -> int:
+    """Pack a list of 16 (zero-indexed) tiles."""
+    ret_val = 0
+    for pos, tile in enumerate(board):
+        ret_val |= tile << (4 * pos)
+    return ret_val
+
+
+def to_board(state: int) -> list[int]:
+    """Unpack a state into a list of 16 (zero-indexed) tiles."""
+    return [(state >> (4 * pos)) & 15 for pos in range(16)]
+
+
+def pack(perm: IntegerPermutation) -> tuple[int, int]:
+    """Pack an arrangement (positions -> tiles), returning the state and blank."""
+    board = [perm(pos) - 1 for pos in range(1, 17)]
+    return from_board(board), board.index(BLANK)
+
+
+def unpack(state: int) -> IntegerPermutation:
+    """Return the arrangement (positions -> tiles) of a state."""
+    return IntegerPermutation(
+        {pos + 1: tile + 1 for pos, tile in enumerate(to_board(state))}
+    )
+
+
+def blank_position(state: int) -> int:
+    """Find the empty square of a state."""
+    for pos in range(16):
+        if (state >> (4 * pos)) & 15 == BLANK:
+            return pos
+    raise ValueError(f"State {state:#x} has no empty square")
+
+
+def tile_at(state: int, pos: int) -> int:
+    """Return the (zero-indexed) tile at a position."""
+    return (state >> (4 * pos)) & 15
+
+
+def successors(state: int, blank: int) -> Iterator[tuple[str, int, int, int]]:
+    """Yield the direction, moved tile, new state and new blank of each move."""
+    for direction, new_blank, shift, new_shift in MOVES[blank]:
+        tile = (state >> new_shift) & 15
+        swap = tile ^ BLANK
+        yield direction, tile, state ^ (swap << shift) ^ (swap << new_shift), new_blank
+
+
+def apply_move(state: int, blank: int, direction: str) -> tuple[int, int, int]:
+    """Move the empty square, returning the new state, new blank and moved tile."""
+    try:
+        new_blank, shift, new_shift = MOVE_BY_DIRECTION[blank][direction[0].lower()]
+    except (IndexError, KeyError):
+        raise ValueError(f"Invalid direction {direction!r}") from None
+    tile = (state >> new_shift) & 15
+    swap = tile ^ BLANK
+    return state ^ (swap << shift) ^ (swap << new_shift), new_blank, tile
+
+
+def replay(state: int, blank: int, moves: str) -> tuple[int, int, list[int]]:
+    """
+    Apply a sequence of moves.
+
+    Return the final state and blank, and the tiles moved (numbered from 1, as
+    in the puzzle input).
+    """
+    tiles: list[int] = []
+    for direction in moves:
+        state, blank, tile = apply_move(state, blank, direction)
+        tiles.append(tile + 1)
+    return state, blank, tiles
+
+
+def is_solvable(state: int, blank: int) -> bool:
+    """
+    Return true if the state can be solved.
+
+    As in ``fifteenpuzzle.valid_permutation``, the parity of the arrangement
+    has to match the parity of the distance from the empty square to its goal.
+    """
+    board = to_board(state)
+    inversions = sum(
+        1 for j in range(16) for k in range(j + 1, 16) if board[j] > board[k]
+    )
+    distance = (3 - blank // 4) + (3 - blank % 4)
+    return inversions % 2 == distance % 2
+
+
+def to_text(state: int) -> str:
+    """Return as text in the style of the puzzle input."""
+    board = to_board(state)
+    return "\n".join(
+        " ".join("E" if tile == BLANK else str(tile + 1) for tile in board[k : k + 4])
+        for k in range(0, 16, 4)
+    )
+
+
+def replay_tiles(state: int, blank: int, tiles: Sequence[int]) -> tuple[int, int]:
+    """
+    Slide the tiles (numbered from 1) into the empty square in turn.
+
+    :raises ValueError: If a tile is not next to the empty square.
+    """
+    for tile in tiles:
+        for _, new_blank, shift, new_shift in MOVES[blank]:
+            if (state >> new_shift) & 15 == tile - 1:
+                swap = (tile - 1) ^ BLANK
+                state ^= (swap << shift) ^ (swap << new_shift)
+                blank = new_blank
+                break
+        else:
+            raise ValueError(f"Tile {tile} is not next to the empty square")
+    return state, blank
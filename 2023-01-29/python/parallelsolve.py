@@ -0,0 +1,182 @@
+"""Solve a 15 puzzle with IDA* spread over several processes."""
+
+from __future__ import annotations
+
+import os
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import Event
+from typing import TYPE_CHECKING, Final, NamedTuple
+
+from fifteenpuzzle import (as_puzzle_input, read_arrangement, scramble,
+                           valid_permutation)
+from idastar import (CHECK_INTERVAL, FOUND, IDAStar, SearchLimitReached,
+                     to_board)
+from integerpermutations import IDENTITY, IntegerPermutation
+from packedboard import BLANK, NEIGHBORS, OPPOSITE
+
+if TYPE_CHECKING:
+    from multiprocessing.synchronize import Event as EventType
+
+    from patterndb import AdditiveHeuristic
+
+# The search tree is cut a few moves below the root, and each subtree is one
+# task. Every iteration of IDA* runs all the subtrees with the same bound; as
+# soon as one worker finds a solution it sets a shared flag; the tasks not yet
+# started return at once, and running ones within ``CHECK_INTERVAL`` nodes. All
+# solutions within a bound have the same length, so the result is optimal, just
+# like ``idastar.solve``.
+
+TASKS_PER_WORKER: Final[int] = 8
+
+MAX_SPLIT_DEPTH: Final[int] = 8
+
+_found: EventType | None = None
+
+_heuristic: AdditiveHeuristic | None = None
+
+
+class Subproblem(NamedTuple):
+    """The board a few moves in, and the moves and tiles that lead there."""
+
+    board: list[int]
+    moves: str
+    tiles: list[int]
+
+
+class TaskResult(NamedTuple):
+    """What a worker found below one subproblem."""
+
+    bound: int
+    moves: str
+    tiles: list[int]
+    nodes_expanded: int
+
+
+def split(board: list[int], num_tasks: int) -> list[Subproblem] | Subproblem:
+    """
+    Cut the search tree into at least ``num_tasks`` subproblems.
+
+    Return a single subproblem instead if it is already solved, as it is then
+    reached by the fewest possible moves.
+    """
+    layer = [Subproblem(board, "", [])]
+    for _ in range(MAX_SPLIT_DEPTH):
+        if len(layer) >= num_tasks:
+            break
+        next_layer: list[Subproblem] = []
+        for sub in layer:
+            blank = sub.board.index(BLANK)
+            prev = sub.moves[-1:]
+            for direction, new_blank in NEIGHBORS[blank]:
+                if direction == OPPOSITE[prev]:
+                    continue
+                new_board = sub.board.copy()
+                tile = new_board[new_blank]
+                new_board[blank] = tile
+                new_board[new_blank] = BLANK
+                new_sub = Subproblem(
+                    new_board, sub.moves + direction, sub.tiles + [tile + 1]
+                )
+                if new_board == sorted(new_board):
+                    return new_sub
+                next_layer.append(new_sub)
+        layer = next_layer
+    return layer
+
+
+@dataclass
+class _WorkerSearch(IDAStar):
+    """An IDA* search that gives up once another worker has found a solution."""
+
+    def _check_after(self: _WorkerSearch) -> int:
+        """Check the shared flag at least every ``CHECK_INTERVAL`` nodes."""
+        return min(super()._check_after(), self.nodes_expanded + CHECK_INTERVAL)
+
+    def check_limits(self: _WorkerSearch) -> None:
+        """Raise ``SearchLimitReached`` if the shared flag is set."""
+        if _found is not None and _found.is_set():
+            raise SearchLimitReached("Another worker found a solution")
+        super().check_limits()
+
+
+def _init_worker(found: EventType, heuristic: AdditiveHeuristic | None) -> None:
+    """Store the shared flag and the pattern databases in a worker."""
+    global _found, _heuristic
+    _found = found
+    _heuristic = heuristic
+
+
+def _search(sub: Subproblem, bound: int) -> TaskResult:
+    """Run one IDA* iteration below a subproblem."""
+    if _found is not None and _found.is_set():
+        return TaskResult(1_000, "", [], 0)
+    search = _WorkerSearch(sub.board.copy(), heuristic=_heuristic)
+    try:
+        result = search.search_from(len(sub.moves), bound, sub.moves[-1:])
+    except SearchLimitReached:
+        return TaskResult(1_000, "", [], search.nodes_expanded)
+    if result == FOUND:
+        if _found is not None:
+            _found.set()
+        return TaskResult(
+            FOUND,
+            sub.moves + "".join(search.moves),
+            sub.tiles + search.tiles,
+            search.nodes_expanded,
+        )
+    return TaskResult(result, "", [], search.nodes_expanded)
+
+
+def solve(
+    puzzle: IntegerPermutation,
+    heuristic: AdditiveHeuristic | None = None,
+    workers: int | None = None,
+) -> tuple[str, list[int]]:
+    """
+    Solve the puzzle with IDA* on several processes and return an optimal route.
+
+    :param heuristic: Pattern databases from ``patterndb.load``, if any. Each
+        worker maps the same files, so they are shared through the page cache.
+    :param workers: The number of processes (by default, one per CPU).
+    """
+    if not valid_permutation(puzzle):
+        raise ValueError("Not a valid puzzle layout.")
+    if workers is None:
+        workers = os.cpu_count() or 1
+    board = to_board(puzzle)
+    if board == sorted(board):
+        return "", []
+    subproblems = split(board, TASKS_PER_WORKER * workers)
+    if isinstance(subproblems, Subproblem):
+        return subproblems.moves, subproblems.tiles
+    bound = IDAStar(board, heuristic=heuristic).estimate()
+    found = Event()
+    with ProcessPoolExecutor(
+        workers, initializer=_init_worker, initargs=(found, heuristic)
+    ) as pool:
+        while True:
+            results = list(
+                pool.map(_search, subproblems, [bound] * len(subproblems))
+            )
+            for res in results:
+                if res.bound == FOUND:
+                    return res.moves, res.tiles
+            bound = min(res.bound for res in results)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("filename", nargs="?", help="file with the puzzle layout")
+    parser.add_argument("--workers", type=int, help="number of processes")
+    args = parser.parse_args()
+    if args.filename is not None:
+        with open(args.filename, "rt") as infile:
+            puzzle = read_arrangement(infile.read())
+    else:
+        puzzle = scramble(IDENTITY)
+
+    print(as_puzzle_input(puzzle))
+    print("\n---\n")
+    print("\n".join(str(k) for k in solve(puzzle, workers=args.workers)[1]))
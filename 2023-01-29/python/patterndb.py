@@ -0,0 +1,204 @@
+"""Build, store and look up additive pattern databases for the 15 puzzle."""
+
+from __future__ import annotations
+
+import mmap
+import os
+from argparse import ArgumentParser
+from collections import deque
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Final
+
+from idastar import to_board
+from integerpermutations import IntegerPermutation
+from packedboard import BLANK, NEIGHBORS
+
+# A pattern database records, for every placement of a group of tiles, how many
+# moves of those tiles it takes to put them all in their goal positions. The
+# other tiles are ignored, and the empty square may move freely through them.
+# Since only moves of the group's own tiles are counted, the values for groups
+# with no tiles in common can be added and still never overestimate.
+#
+# A placement is indexed by packing the (zero-indexed) positions of the group's
+# tiles 4 bits apiece, so a table for k tiles is 16**k bytes with one byte per
+# entry. Groups of up to six tiles are supported (16 MB per table).
+
+PARTITIONS: Final[dict[str, list[list[int]]]] = {
+    # Tiles numbered as in the puzzle input (1 to 15).
+    "5-5-5": [[1, 2, 3, 5, 6], [4, 7, 8, 11, 12], [9, 10, 13, 14, 15]],
+    "6-6-3": [[1, 5, 6, 9, 10, 13], [7, 8, 11, 12, 14, 15], [2, 3, 4]],
+}
+
+DEFAULT_PARTITION: Final[str] = "5-5-5"
+
+DEFAULT_DIRECTORY: Final[str] = os.path.join(os.path.dirname(__file__), "patterndb")
+
+MAX_PATTERN_SIZE: Final[int] = 6
+
+
+def table_filename(tiles: Sequence[int]) -> str:
+    """Return the file name for the table of a group of tiles (numbered from 1)."""
+    return "pdb_" + "-".join(str(k) for k in tiles) + ".bin"
+
+
+def build_table(tiles: Sequence[int]) -> bytearray:
+    """
+    Compute the pattern database for a group of tiles (numbered from 1).
+
+    This runs a breadth-first search backwards from the solved puzzle over the
+    placements of the group and the empty square, where moving a tile of the
+    group costs one and moving any other tile costs nothing.
+    """
+    if not 0 < len(tiles) <= MAX_PATTERN_SIZE:
+        raise ValueError(f"Groups must have 1 to {MAX_PATTERN_SIZE} tiles")
+    shifts = [4 * k for k in range(len(tiles))]
+    blank_shift = 4 * len(tiles)
+    pattern_mask = (1 << blank_shift) - 1
+    table = bytearray(b"\xff") * (1 << blank_shift)
+    cost = bytearray(b"\xff") * (1 << (blank_shift + 4))
+    start = sum((tile - 1) << shift for tile, shift in zip(tiles, shifts))
+    start |= BLANK << blank_shift
+    cost[start] = 0
+    queue = deque([start])
+    while queue:
+        key = queue.popleft()
+        dist = cost[key]
+        blank = key >> blank_shift
+        pattern = key & pattern_mask
+        if dist < table[pattern]:
+            table[pattern] = dist
+        occupied = {(pattern >> shift) & 15: shift for shift in shifts}
+        for _, new_blank in NEIGHBORS[blank]:
+            if new_blank in occupied:
+                shift = occupied[new_blank]
+                new_key = (pattern ^ ((new_blank ^ blank) << shift)) | (
+                    new_blank << blank_shift
+                )
+                if dist + 1 < cost[new_key]:
+                    cost[new_key] = dist + 1
+                    queue.append(new_key)
+            else:
+                new_key = pattern | (new_blank << blank_shift)
+                if dist < cost[new_key]:
+                    cost[new_key] = dist
+                    queue.appendleft(new_key)
+    return table
+
+
+@dataclass(frozen=True)
+class PatternDatabase:
+    """A table of move counts for one group of tiles."""
+
+    tiles: tuple[int, ...]
+    table: bytes | bytearray | mmap.mmap
+    filename: str | None = None
+
+    def __reduce__(self: PatternDatabase):
+        """Pickle a memory-mapped table by its file name, so it is mapped again."""
+        if self.filename is None:
+            return (self.__class__, (self.tiles, bytes(self.table)))
+        return (_map_table, (self.tiles, self.filename))
+
+    def index(self: PatternDatabase, where: Sequence[int]) -> int:
+        """Return the table index, given the (zero-indexed) position of each tile."""
+        ret_val = 0
+        shift = 0
+        for tile in self.tiles:
+            ret_val |= where[tile - 1] << shift
+            shift += 4
+        return ret_val
+
+    def lookup(self: PatternDatabase, where: Sequence[int]) -> int:
+        """Return the moves needed by this group, given the position of each tile."""
+        return self.table[self.index(where)]
+
+    @classmethod
+    def load(cls: type[PatternDatabase], tiles: Sequence[int], directory: str):
+        """Memory-map the table for a group of tiles from a directory."""
+        return _map_table(tuple(tiles), os.path.join(directory, table_filename(tiles)))
+
+
+def _map_table(tiles: tuple[int, ...], filename: str) -> PatternDatabase:
+    """Memory-map the table for a group of tiles from a file."""
+    with open(filename, "rb") as infile:
+        table = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(table) != 1 << (4 * len(tiles)):
+        raise ValueError(f"Table for tiles {list(tiles)} has the wrong size")
+    return PatternDatabase(tiles, table, filename)
+
+
+@dataclass(frozen=True)
+class AdditiveHeuristic:
+    """The sum of the pattern databases of a partition of the tiles."""
+
+    databases: tuple[PatternDatabase, ...]
+
+    @property
+    def pattern_of(self: AdditiveHeuristic) -> list[int]:
+        """Return the database for each (zero-indexed) tile, or -1 if none."""
+        ret_val = [-1] * 16
+        for idx, database in enumerate(self.databases):
+            for tile in database.tiles:
+                ret_val[tile - 1] = idx
+        return ret_val
+
+    def from_positions(self: AdditiveHeuristic, where: Sequence[int]) -> int:
+        """Return the estimate, given the (zero-indexed) position of each tile."""
+        return sum(database.lookup(where) for database in self.databases)
+
+    def from_board(self: AdditiveHeuristic, board: Sequence[int]) -> int:
+        """Return the estimate for a board as used in ``idastar``."""
+        where = [0] * 16
+        for pos, tile in enumerate(board):
+            where[tile] = pos
+        return self.from_positions(where)
+
+    def __call__(self: AdditiveHeuristic, arr: IntegerPermutation) -> int:
+        """Evaluate how close the puzzle is to solved, like ``bruteforce.score``."""
+        return self.from_board(to_board(arr))
+
+
+def build(
+    partition: str = DEFAULT_PARTITION, directory: str = DEFAULT_DIRECTORY
+) -> None:
+    """Build the tables of a partition and save them in a directory."""
+    os.makedirs(directory, exist_ok=True)
+    for tiles in PARTITIONS[partition]:
+        filename = os.path.join(directory, table_filename(tiles))
+        if os.path.exists(filename):
+            print(f"{filename} already exists")
+            continue
+        print(f"Building {filename}")
+        table = build_table(tiles)
+        with open(filename + ".tmp", "wb") as outfile:
+            outfile.write(table)
+        os.replace(filename + ".tmp", filename)
+
+
+def load(
+    partition: str = DEFAULT_PARTITION, directory: str = DEFAULT_DIRECTORY
+) -> AdditiveHeuristic:
+    """Load the tables of a partition (built with ``build``) from a directory."""
+    try:
+        return AdditiveHeuristic(
+            tuple(
+                PatternDatabase.load(tiles, directory)
+                for tiles in PARTITIONS[partition]
+            )
+        )
+    except FileNotFoundError as err:
+        raise FileNotFoundError(
+            f"{err.filename} not found; run `python patterndb.py --partition "
+            f"{partition}` to build it"
+        ) from err
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--partition", choices=list(PARTITIONS), default=DEFAULT_PARTITION
+    )
+    parser.add_argument("--directory", default=DEFAULT_DIRECTORY)
+    args = parser.parse_args()
+    build(args.partition, args.directory)
@@ -61,7 +61,7 @@ if len(puzzles) == 2 or valid:
     if len(puzzles) == 2:
         describe_puzzle(puz)
     if valid_permutation(puz):
-        moves, tiles = bruteforce.solve(puz)
+        moves, tiles = bruteforce.solve(puz, "ida*")
         print(
             "\n"
             + fill("Solution (sequence of tiles): " + ", ".join(str(k) for k in tiles))
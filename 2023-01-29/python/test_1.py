@@ -0,0 +1,156 @@
+# test.py
+
+import os
+from random import Random
+from typing import Final
+
+import pytest
+
+import anytime
+import batch
+import bidirectional
+import bruteforce
+import corpus
+import idastar
+import parallelsolve
+import patterndb
+from fifteenpuzzle import valid_permutation
+from packedboard import (BLANK, GOAL, GOAL_BLANK, blank_position, from_board,
+                         is_solvable, pack, replay, to_board, to_text, unpack)
+from patterndb import AdditiveHeuristic, PatternDatabase, build_table
+
+PUZZLES: Final[list[tuple[int, int]]] = list(corpus.generate(6, 24, seed=2023)) + [
+    (GOAL, GOAL_BLANK)
+]
+
+# Small tables, so the pattern databases are quick to build for the tests.
+SMALL_PARTITION: Final[list[list[int]]] = [
+    [1, 2, 3],
+    [4, 7, 8],
+    [5, 6, 9],
+    [10, 13, 14],
+    [11, 12, 15],
+]
+
+
+@pytest.fixture(scope="module")
+def heuristic():
+    return AdditiveHeuristic(
+        tuple(
+            PatternDatabase(tuple(tiles), build_table(tiles))
+            for tiles in SMALL_PARTITION
+        )
+    )
+
+
+def check_route(state: int, blank: int, moves: str, tiles: list[int]) -> None:
+    assert replay(state, blank, moves) == (GOAL, GOAL_BLANK, tiles)
+
+
+def test_pack_round_trip():
+    rng = Random(1)
+    for _ in range(100):
+        state, blank = corpus.random_solvable(rng)
+        assert pack(unpack(state)) == (state, blank)
+        assert from_board(to_board(state)) == state
+        assert blank_position(state) == blank
+
+
+def test_random_solvable():
+    rng = Random(2)
+    for _ in range(500):
+        state, blank = corpus.random_solvable(rng)
+        board = to_board(state)
+        assert sorted(board) == list(range(16))
+        assert board[blank] == BLANK
+        assert is_solvable(state, blank)
+        assert valid_permutation(unpack(state))
+
+
+def test_optimal_solvers(heuristic):
+    for state, blank in PUZZLES:
+        puzzle = unpack(state)
+        moves, tiles = idastar.solve(puzzle)
+        check_route(state, blank, moves, tiles)
+        for solution in [
+            idastar.solve(puzzle, heuristic),
+            parallelsolve.solve(puzzle, workers=2),
+            parallelsolve.solve(puzzle, heuristic, workers=2),
+            anytime.solve(puzzle, weights=(1.0,)),
+            anytime.solve(puzzle, heuristic, weights=(1.0,)),
+            bidirectional.solve(puzzle),
+        ]:
+            assert len(solution[0]) == len(moves)
+            check_route(state, blank, *solution)
+
+
+def test_anytime_bound():
+    for state, blank in PUZZLES:
+        optimal = len(idastar.solve(unpack(state))[0])
+        solution = anytime.search(unpack(state))
+        check_route(state, blank, solution.moves, solution.tiles)
+        assert len(solution.moves) <= solution.bound * optimal
+
+
+def test_anytime_route():
+    state, blank = PUZZLES[0]
+    route = bruteforce.solve(unpack(state), "anytime", node_budget=1_000)
+    moves, tiles = route
+    check_route(state, blank, moves, tiles)
+    assert len(route) == 2 and route.bound >= 1
+    # Fewer nodes than the first pass needs, and fewer than CHECK_INTERVAL.
+    with pytest.raises(idastar.SearchLimitReached):
+        anytime.solve(unpack(state), node_budget=50)
+
+
+def test_best_first():
+    for state, blank in PUZZLES:
+        for max_states in [None, 5_000]:
+            check_route(
+                state,
+                blank,
+                *bruteforce.best_first(unpack(state), max_states=max_states),
+            )
+
+
+def test_best_first_memory_budget():
+    for state, _ in corpus.generate(3, 40, seed=1):
+        with pytest.raises(idastar.SearchLimitReached):
+            bruteforce.best_first(unpack(state), max_states=20)
+
+
+def test_heuristic_admissible(heuristic):
+    heuristics = [heuristic]
+    # The full-size tables are built with patterndb.py, so are only tested if present.
+    if os.path.isdir(patterndb.DEFAULT_DIRECTORY):
+        heuristics.append(patterndb.load())
+    for state, _ in PUZZLES + list(corpus.generate(20, 12, seed=7)):
+        board = to_board(state)
+        distance = len(bidirectional.solve(unpack(state))[0])
+        assert idastar.linear_conflict(board) <= distance
+        for h in heuristics:
+            assert h.from_board(board) <= distance
+
+
+def test_unsupported_option():
+    with pytest.raises(ValueError):
+        bruteforce.solve(unpack(PUZZLES[0][0]), "bidirectional", max_states=10)
+
+
+def test_batch_records():
+    state, _ = PUZZLES[0]
+    records = [
+        batch.solve_one("solved", to_text(state)),
+        batch.solve_one("limit", to_text(state), max_nodes=1),
+        batch.solve_one("partial", "1 2 3"),
+        batch.solve_one("repeated", to_text(state).replace("15", "14")),
+        batch.solve_one("unsolvable", to_text(GOAL).replace("14 15", "15 14")),
+    ]
+    assert [k["status"] for k in records] == [
+        "solved",
+        "limit",
+        "invalid",
+        "invalid",
+        "invalid",
+    ]
+    assert all(list(k) == list(batch.RECORD_KEYS) for k in records)
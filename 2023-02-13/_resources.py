@@ -1,39 +1,293 @@
 # _resources.py
 from __future__ import annotations
 
-from collections import defaultdict
+import gzip
+import io
+import json
+import os
+import sys
+import tempfile
+import zipfile
+from argparse import ArgumentParser
+from array import array
+from collections import Counter
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+from itertools import accumulate
 from textwrap import TextWrapper
-from typing import NamedTuple
+from typing import Final, NamedTuple, TextIO
 
 """Resources for solutions to David Amos's weekly coding challenge for 2023-02-13:
     https://discourse.davidamos.dev/t/flight-inference/135
 """
 
+ANSWER_FORMATS: Final[tuple[str, ...]] = ("text", "tsv", "jsonl")
+
+
+class CSRGraph(NamedTuple):
+    """
+    A directed graph on the vertices 0, 1, ..., n - 1, in compressed sparse rows.
+
+    The edges from vertex ``v`` go to ``targets[offsets[v]:offsets[v + 1]]``, and
+    ``names[v]`` is the name of ``v`` in the original graph.
+    """
+
+    names: list[str]
+    ids: dict[str, int]
+    offsets: array
+    targets: array
+
+    @classmethod
+    def from_edges(
+        cls: type[CSRGraph], vertices: Sequence[str], edges: Mapping[str, list[str]]
+    ) -> CSRGraph:
+        """Number the vertices in order and gather the edges from each."""
+        names = list(vertices)
+        ids = {vertex: k for k, vertex in enumerate(names)}
+        offsets = array("q", [0])
+        targets = array("q")
+        for vertex in names:
+            targets.extend(ids[dest] for dest in edges.get(vertex, []))
+            offsets.append(len(targets))
+        return cls(names, ids, offsets, targets)
+
+    @classmethod
+    def from_pairs(
+        cls: type[CSRGraph],
+        names: list[str],
+        sources: Sequence[int],
+        targets: Sequence[int],
+    ) -> CSRGraph:
+        """Gather numbered edges by their source, keeping them in order."""
+        counts = Counter(sources)
+        offsets = array("q", [0])
+        offsets.extend(accumulate(counts[k] for k in range(len(names))))
+        order = sorted(range(len(sources)), key=sources.__getitem__)
+        ordered = array("q", map(targets.__getitem__, order))
+        ids = {name: k for k, name in enumerate(names)}
+        return cls(names, ids, offsets, ordered)
+
+    @property
+    def num_vertices(self: CSRGraph) -> int:
+        """Return the number of vertices."""
+        return len(self.names)
+
+    def successors(self: CSRGraph, vertex: int) -> array:
+        """Return the vertices that the edges from a vertex go to."""
+        return self.targets[self.offsets[vertex] : self.offsets[vertex + 1]]
+
+    def sources(self: CSRGraph) -> array:
+        """Return the vertex that each edge comes from, in the order of ``targets``."""
+        sources = array("q")
+        for vertex in range(self.num_vertices):
+            sources.extend([vertex] * (self.offsets[vertex + 1] - self.offsets[vertex]))
+        return sources
+
+    def name_list(self: CSRGraph, vertices: Iterable[int]) -> list[str]:
+        """Look up the names of some vertices."""
+        names = self.names
+        return [names[k] for k in vertices]
+
+
+class EdgeLists(Mapping[str, list[str]]):
+    """
+    The destinations of the edges from each vertex, looked up as needed.
+
+    Like the ``defaultdict`` this replaces, it has a key for each vertex with
+    edges from it, and gives an empty list for any other vertex.
+    """
+
+    def __init__(self: EdgeLists, graph: CSRGraph) -> None:
+        self.graph = graph
+
+    def __getitem__(self: EdgeLists, vertex: str) -> list[str]:
+        """List where the edges from a vertex go."""
+        return self.graph.name_list(self.graph.successors(self.graph.ids[vertex]))
+
+    def __iter__(self: EdgeLists) -> Iterator[str]:
+        """Iterate over the vertices with edges from them."""
+        offsets = self.graph.offsets
+        return (
+            name
+            for vertex, name in enumerate(self.graph.names)
+            if offsets[vertex] != offsets[vertex + 1]
+        )
+
+    def __contains__(self: EdgeLists, vertex: object) -> bool:
+        """Return true if there are edges from a vertex, as ``__iter__`` does."""
+        offsets = self.graph.offsets
+        k = self.graph.ids.get(vertex)
+        return k is not None and offsets[k] != offsets[k + 1]
+
+    def __len__(self: EdgeLists) -> int:
+        """Return the number of vertices with edges from them."""
+        offsets = self.graph.offsets
+        return sum(1 for k in range(len(offsets) - 1) if offsets[k] != offsets[k + 1])
+
+
+def bit_indices(bits: int) -> list[int]:
+    """List the positions of the bits that are set."""
+    return [k for k, digit in enumerate(bin(bits)[:1:-1]) if digit == "1"]
+
+
+class ReachabilityResult(Mapping[str, list[str]]):
+    """
+    The destinations reachable from each vertex, as a bitset for each.
+
+    It can be used like the dictionary of lists that ``reachable`` used to
+    return, but stores one bit per vertex pair instead of a reference to a name,
+    and only makes a list of names when one is looked up. Destinations are
+    listed in the order the vertices are numbered in.
+
+    :param names: The name of each vertex, by number.
+    :param ids: The number of each vertex, by name.
+    :param rows: For each vertex, an int with bit ``k`` set if it reaches
+        vertex ``k``. Its own bit is ignored.
+    """
+
+    def __init__(
+        self: ReachabilityResult,
+        names: list[str],
+        ids: dict[str, int],
+        rows: Iterable[int],
+    ) -> None:
+        self.names = names
+        self.ids = ids
+        self.rows = [bits & ~(1 << v) for v, bits in enumerate(rows)]
+
+    @classmethod
+    def from_packed(
+        cls: type[ReachabilityResult], graph: CSRGraph, rows: Iterable[bytes]
+    ) -> ReachabilityResult:
+        """Make a result from rows of packed bits, least significant bit first."""
+        return cls(
+            graph.names, graph.ids, (int.from_bytes(row, "little") for row in rows)
+        )
+
+    def __getitem__(self: ReachabilityResult, origin: str) -> list[str]:
+        """List the destinations reachable from a vertex."""
+        return self.name_list(self.bits(origin))
+
+    def __iter__(self: ReachabilityResult) -> Iterator[str]:
+        """Iterate over the origins."""
+        return iter(self.names)
+
+    def __contains__(self: ReachabilityResult, origin: object) -> bool:
+        """Return true if a vertex is an origin, without listing its destinations."""
+        return origin in self.ids
+
+    def __len__(self: ReachabilityResult) -> int:
+        """Return the number of origins."""
+        return len(self.names)
+
+    def bits(self: ReachabilityResult, origin: str) -> int:
+        """Return the bitset of the destinations reachable from a vertex."""
+        return self.rows[self.ids[origin]]
+
+    def reaches(self: ReachabilityResult, origin: str, dest: str) -> bool:
+        """Return true if there is a route from one vertex to another."""
+        return bool((self.bits(origin) >> self.ids[dest]) & 1)
+
+    def count(self: ReachabilityResult, origin: str) -> int:
+        """Return the number of destinations reachable from a vertex."""
+        return self.bits(origin).bit_count()
+
+    def union(self: ReachabilityResult, *origins: str) -> list[str]:
+        """List the destinations reachable from any of the vertices."""
+        bits = 0
+        for origin in origins:
+            bits |= self.bits(origin)
+        return self.name_list(bits)
+
+    def intersection(self: ReachabilityResult, *origins: str) -> list[str]:
+        """List the destinations reachable from all of the vertices."""
+        bits = -1
+        for origin in origins:
+            bits &= self.bits(origin)
+        return self.name_list(bits) if origins else []
+
+    def difference(self: ReachabilityResult, origin: str, *others: str) -> list[str]:
+        """List the destinations reachable from a vertex but none of the others."""
+        bits = self.bits(origin)
+        for other in others:
+            bits &= ~self.bits(other)
+        return self.name_list(bits)
+
+    def name_list(self: ReachabilityResult, bits: int) -> list[str]:
+        """Look up the names of the vertices in a bitset."""
+        names = self.names
+        return [names[k] for k in bit_indices(bits)]
+
+    def to_dict(self: ReachabilityResult) -> dict[str, list[str]]:
+        """Return the destinations from every vertex as a dictionary of lists."""
+        return dict(self.items())
+
 
 class DirectedGraph(NamedTuple):
     vertices: list[str]
-    edges: dict[str, list[str]]
+    edges: Mapping[str, list[str]]
+    csr: CSRGraph | None = None
 
     @classmethod
-    def read_file(cls: type[DirectedGraph], filename: str) -> DirectedGraph:
-        """Read a directed graph dataset from a file."""
-        with open(filename, "rt") as infile:
-            data = infile.read()
-        return cls.read_string(data)
+    def read_file(
+        cls: type[DirectedGraph], filename: str, cache: bool = False
+    ) -> DirectedGraph:
+        """
+        Read a directed graph dataset from a file.
+
+        :param cache: Keep the parsed graph in a file next to this one (see
+            ``read_cache``), and use that instead while this one is unchanged.
+        """
+        if cache:
+            graph = read_cache(filename)
+            if graph is not None:
+                return cls.from_csr(graph)
+        with open(filename, "rb") as infile:
+            dgraph = cls.read_bytes(infile.read())
+        if cache:
+            write_cache(filename, dgraph.integer_view())
+        return dgraph
 
     @classmethod
     def read_string(cls: type[DirectedGraph], data: str) -> DirectedGraph:
         """Read a directed graph dataset from a string."""
-        edges = [
-            ((k := line.split())[0].strip(), k[1].strip()) for line in data.splitlines()
-        ]
-        edge_dict: defaultdict[str, list[str]] = defaultdict(list)
-        vertices: set[str] = set()
-        for e0, e1 in edges:
-            edge_dict[e0].append(e1)
-            vertices.add(e0)
-            vertices.add(e1)
-        return DirectedGraph(list(vertices), edge_dict)
+        return cls.read_bytes(data.encode())
+
+    @classmethod
+    def read_bytes(cls: type[DirectedGraph], data: bytes) -> DirectedGraph:
+        """
+        Read a directed graph dataset (two names on each line) from bytes.
+
+        :raises ValueError: If a line that is not blank does not name exactly two
+            vertices.
+        """
+        rows = [line.split() for line in data.splitlines()]
+        for num, row in enumerate(rows, 1):
+            if len(row) != 2 and row:
+                raise ValueError(f"Line {num} should name two vertices.")
+        sources = [row[0] for row in rows if row]
+        targets = [row[1] for row in rows if row]
+        # Number the vertices with edges from them first, in order of their first
+        # edge, so that ``edges`` lists them in the order a dict would.
+        ids = {name: k for k, name in enumerate(dict.fromkeys(sources + targets))}
+        names = [k.decode() for k in ids]
+        return cls.from_csr(
+            CSRGraph.from_pairs(
+                names,
+                list(map(ids.__getitem__, sources)),
+                list(map(ids.__getitem__, targets)),
+            )
+        )
+
+    @classmethod
+    def from_csr(cls: type[DirectedGraph], graph: CSRGraph) -> DirectedGraph:
+        """Make a graph with names from its integer view."""
+        return cls(list(graph.names), EdgeLists(graph), graph)
+
+    def integer_view(self: DirectedGraph) -> CSRGraph:
+        """Return the graph with the vertices numbered (as built when it was read)."""
+        if self.csr is not None:
+            return self.csr
+        return CSRGraph.from_edges(self.vertices, self.edges)
 
     def output_graph(self: DirectedGraph) -> str:
         """Output the directed graph as a string."""
@@ -44,10 +298,128 @@ class DirectedGraph(NamedTuple):
         )
 
 
-def format_answer(output: dict[str, list[str]]) -> str:
-    """Produce a nicely formatted answer."""
+def cache_file(filename: str) -> str:
+    """Return where the parsed graph from a file is cached."""
+    return filename + ".npz"
+
+
+def read_cache(filename: str) -> CSRGraph | None:
+    """
+    Read the cached graph for a file, if it is there and up to date.
+
+    The cache is a NumPy ``.npz`` file holding the vertex names (joined by
+    newlines), the CSR arrays, and the size and modification time of the file
+    it was made from.
+    """
+    import numpy as np
+
+    stat = os.stat(filename)
+    try:
+        with np.load(cache_file(filename)) as data:
+            if data["source"].tolist() != [stat.st_size, stat.st_mtime_ns]:
+                return None
+            text = data["names"].tobytes().decode()
+            offsets = array("q", data["offsets"].astype(np.int64).tobytes())
+            targets = array("q", data["targets"].astype(np.int64).tobytes())
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+        return None
+    names = text.split("\n") if text else []
+    return CSRGraph(names, {name: k for k, name in enumerate(names)}, offsets, targets)
+
+
+def write_cache(filename: str, graph: CSRGraph) -> None:
+    """Cache the parsed graph for a file."""
+    import numpy as np
+
+    stat = os.stat(filename)
+    target = cache_file(filename)
+    # Write to a temporary file first, so that a reader never sees half a cache.
+    handle, temp_file = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(target)), suffix=".tmp"
+    )
+    try:
+        with os.fdopen(handle, "wb") as outfile:
+            np.savez(
+                outfile,
+                source=np.array([stat.st_size, stat.st_mtime_ns], np.int64),
+                names=np.frombuffer("\n".join(graph.names).encode(), np.uint8),
+                offsets=np.frombuffer(graph.offsets, np.int64),
+                targets=np.frombuffer(graph.targets, np.int64),
+            )
+        os.replace(temp_file, target)
+    except BaseException:
+        os.unlink(temp_file)
+        raise
+
+
+def write_answer(
+    output: Mapping[str, Iterable[str]], outfile: TextIO, fmt: str = "text"
+) -> None:
+    """
+    Write an answer a line at a time, sorted by origin.
+
+    Each origin's destinations are only looked up when its line is written, so
+    lazy mappings (such as ``diskclosure.DiskClosure``) are never held in memory
+    all at once.
+
+    :param fmt: ``"text"`` for the wrapped lines of ``format_answer``, ``"tsv"``
+        for the origin and its destinations separated by tabs, or ``"jsonl"`` for
+        a JSON object with ``origin`` and ``destinations`` on each line.
+    """
+    if fmt not in ANSWER_FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}; expected one of {ANSWER_FORMATS}")
     wrapper = TextWrapper(width=75, subsequent_indent=" " * 4)
-    out_str = ""
-    for key, val in sorted(output.items()):
-        out_str += wrapper.fill(f"{key}: " + ", ".join(sorted(val))) + "\n"
-    return out_str
+    for key in sorted(output):
+        dests = sorted(output[key])
+        if fmt == "text":
+            line = f"{key}: " + ", ".join(dests)
+            # Short lines would come back from the wrapper unchanged but slowly.
+            if len(line) <= wrapper.width:
+                outfile.write(line.rstrip() + "\n")
+            else:
+                outfile.write(wrapper.fill(line) + "\n")
+        elif fmt == "tsv":
+            outfile.write("\t".join([key, *dests]) + "\n")
+        else:
+            outfile.write(json.dumps({"origin": key, "destinations": dests}) + "\n")
+
+
+def open_answer(filename: str) -> TextIO:
+    """Open a file to write an answer to, compressed if its name ends in ``.gz``."""
+    if filename.endswith(".gz"):
+        return gzip.open(filename, "wt", encoding="utf-8")
+    return open(filename, "wt", encoding="utf-8")
+
+
+def answer_parser(description: str) -> ArgumentParser:
+    """Make a command line parser for a graph file and where to write the answer."""
+    parser = ArgumentParser(description=description)
+    parser.add_argument("filename", help="file with the edges of the graph")
+    parser.add_argument(
+        "--format",
+        choices=ANSWER_FORMATS,
+        default="text",
+        help="how to write the answer (see write_answer)",
+    )
+    parser.add_argument(
+        "--output", help="file to write to instead of stdout (gzipped if .gz)"
+    )
+    return parser
+
+
+def save_answer(
+    output: Mapping[str, Iterable[str]], fmt: str = "text", filename: str | None = None
+) -> None:
+    """Write an answer to a file, or to stdout if no file is named."""
+    if filename is None:
+        write_answer(output, sys.stdout, fmt)
+    else:
+        with open_answer(filename) as outfile:
+            write_answer(output, outfile, fmt)
+
+
+def format_answer(output: Mapping[str, Iterable[str]]) -> str:
+    """Produce a nicely formatted answer."""
+    buffer = io.StringIO()
+    write_answer(output, buffer)
+    return buffer.getvalue()
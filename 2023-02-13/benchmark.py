@@ -4,93 +4,447 @@
     https://discourse.davidamos.dev/t/flight-inference/135
 """
 
-import timeit
-from typing import Final, NamedTuple
+from __future__ import annotations
 
+import importlib
+import json
+import os
+import platform
+import signal
+import subprocess
+import sys
+import tracemalloc
+from argparse import ArgumentParser
+from array import array
+from itertools import product
+from multiprocessing import Pipe, Process
+from statistics import median
+from time import perf_counter
+from typing import TYPE_CHECKING, Any, Final, NamedTuple
+
+import numpy as np
 import rich.box
 from rich.console import Console
 from rich.table import Table
 
-from _resources import DirectedGraph
+from _resources import CSRGraph, DirectedGraph
+
+if TYPE_CHECKING:
+    from multiprocessing.connection import Connection
+
+# The graphs are made up with ``synthetic_graph``, so that the benchmarks do not
+# depend on data files, and can be run on graphs of any size. Graph files can be
+# benchmarked as well, by naming them.
+#
+# Each backend runs on each graph in a fresh process, which makes the graph,
+# calls ``reachable`` on it ``--warmup`` times untimed and ``--repeat`` times
+# timed, then once more with tracemalloc on for the peak memory (memory used by
+# the workers of ``parallelreach`` is not counted). The process is stopped if it
+# takes longer than ``--timeout``, and a backend that fails on a graph is not
+# tried on bigger ones. The backends in ``MAX_VERTICES`` need a full vertex by
+# vertex matrix (``dynamicreach`` two, for what each vertex reaches and is
+# reached by), so are only tried on graphs up to the size given.
+
+BACKENDS: Final[tuple[str, ...]] = (
+    "graphdestinations",
+    "optimizedgraphdest",
+    "matrix",
+    "matrix2",
+    "sccreach",
+    "bitmatrix",
+    "diskclosure",
+    "parallelreach",
+    "dynamicreach",
+    "reachindex",
+)
+
+MAX_VERTICES: Final[dict[str, int]] = {
+    "matrix": 2_000,
+    "matrix2": 2_000,
+    "bitmatrix": 50_000,
+    "diskclosure": 50_000,
+    "parallelreach": 50_000,
+    "dynamicreach": 50_000,
+}
+
+SIZES: Final[tuple[int, ...]] = (1_000, 10_000, 100_000, 1_000_000)
+
+DEGREE: Final[float] = 2.0
 
+SCC_SIZE: Final[int] = 10
 
-class TimeTest(NamedTuple):
-    """Represent a file and module combo to test with timeit."""
+TIMEOUT: Final[float] = 60.0
 
-    import_str: str
-    graph_file: str
+# A backend is flagged if it is this much slower than in the baseline.
+REGRESSION: Final[float] = 0.1
 
 
-def make_timer(tt: TimeTest) -> timeit.Timer:
-    """Produce a Timer object for the given time test."""
-    return timeit.Timer(
-        "reachable(graph)",
-        setup=tt.import_str
-        + "\nfrom _resources import DirectedGraph"
-        + f"\n\ngraph = DirectedGraph.read_file({tt.graph_file!r})",
+class GraphSpec(NamedTuple):
+    """
+    Describe a synthetic graph.
+
+    :param degree: The average number of edges from each vertex.
+    :param scc_size: The number of vertices in each strongly connected component.
+    """
+
+    num_vertices: int
+    degree: float
+    scc_size: int
+    seed: int
+
+    @property
+    def name(self: GraphSpec) -> str:
+        """Return a short name for the graph."""
+        return f"n={self.num_vertices:,} d={self.degree:g} scc={self.scc_size}"
+
+
+def synthetic_graph(spec: GraphSpec) -> DirectedGraph:
+    """
+    Make a random graph with strongly connected components of a given size.
+
+    The vertices are split into components of ``scc_size`` in a row, and each
+    component is joined up by a cycle through it. The rest of the edges join
+    random pairs of vertices, in the direction from the earlier component to
+    the later, so that no bigger components are formed. The vertices are named
+    in a random order, so the names do not give the structure away.
+    """
+    rng = np.random.default_rng(spec.seed)
+    num_vert = spec.num_vertices
+    vertices = np.arange(num_vert)
+    first = vertices - vertices % spec.scc_size
+    last = np.minimum(first + spec.scc_size, num_vert) - 1
+    on_cycle = first != last
+    cycle_sources = vertices[on_cycle]
+    cycle_targets = np.where(vertices == last, first, vertices + 1)[on_cycle]
+    num_random = max(0, round(spec.degree * num_vert) - len(cycle_sources))
+    ends = np.sort(rng.integers(0, num_vert, (num_random, 2)), axis=1)
+    ends = ends[ends[:, 0] != ends[:, 1]]
+    sources = np.concatenate([cycle_sources, ends[:, 0]])
+    targets = np.concatenate([cycle_targets, ends[:, 1]])
+    order = np.argsort(sources, kind="stable")
+    offsets = np.zeros(num_vert + 1, np.int64)
+    np.cumsum(np.bincount(sources, minlength=num_vert), out=offsets[1:])
+    width = len(str(num_vert - 1))
+    names = [f"v{k:0{width}d}" for k in rng.permutation(num_vert)]
+    graph = CSRGraph(
+        names,
+        {name: k for k, name in enumerate(names)},
+        array("q", offsets.tobytes()),
+        array("q", targets[order].astype(np.int64).tobytes()),
     )
+    return DirectedGraph.from_csr(graph)
 
 
-def run_time_test(tt: TimeTest, num_repeat: int) -> float:
-    """Run the time test and give the return time per execusion."""
-    t = make_timer(tt)
-    return max(k / num_repeat for k in t.repeat(number=num_repeat))
+def load_graph(source: GraphSpec | str) -> DirectedGraph:
+    """Make a synthetic graph, or read one from a file."""
+    if isinstance(source, str):
+        return DirectedGraph.read_file(source, cache=True)
+    return synthetic_graph(source)
 
 
-if __name__ == "__main__":
-    IMPORTS: Final[list[str]] = [
-        "graphdestinations",
-        "optimizedgraphdest",
-        "matrix",
-        "matrix2",
-    ]
-    GRAPH_FILES: Final[dict[str, tuple[int, list[str]]]] = {
-        "flights1.txt": (10_000, []),
-        "gistfile1.txt": (1_000, []),
-        "super_example.txt": (3, ["matrix", "matrix2"]),
-    } | {f"random_{k}.txt": (500, []) for k in range(4)}
-    console = Console()
+def graph_name(source: GraphSpec | str) -> str:
+    """Return the name of a graph in the results."""
+    return source if isinstance(source, str) else source.name
+
+
+def measure(
+    backend: str, source: GraphSpec | str, warmup: int, repeat: int, memory: bool
+) -> dict[str, Any]:
+    """Time one backend on one graph."""
+    reachable = importlib.import_module(backend).reachable
+    dgraph = load_graph(source)
+    for _ in range(warmup):
+        reachable(dgraph)
+    times = []
+    for _ in range(repeat):
+        start_time = perf_counter()
+        reachable(dgraph)
+        times.append(perf_counter() - start_time)
+    result: dict[str, Any] = {
+        "min": min(times),
+        "median": median(times),
+        "times": times,
+    }
+    if memory:
+        tracemalloc.start()
+        reachable(dgraph)
+        result["peak_memory"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result
+
+
+def _measure_into(conn: Connection, *args) -> None:
+    """Send the result of ``measure`` (or the error it raised) down a pipe."""
+    if hasattr(os, "setpgrp"):
+        # Start a process group, so that any workers can be stopped along with this.
+        os.setpgrp()
+    try:
+        conn.send(measure(*args))
+    except Exception as err:
+        conn.send({"error": repr(err)})
+    finally:
+        conn.close()
+
+
+def measure_in_process(
+    backend: str,
+    source: GraphSpec | str,
+    warmup: int,
+    repeat: int,
+    memory: bool,
+    timeout: float | None = None,
+) -> dict[str, Any]:
+    """Run ``measure`` in a new process, giving up after ``timeout`` seconds."""
+    receiver, sender = Pipe(duplex=False)
+    proc = Process(
+        target=_measure_into,
+        args=(sender, backend, source, warmup, repeat, memory),
+    )
+    proc.start()
+    sender.close()
+    ready = receiver.poll(timeout)
+    if not ready:
+        try:
+            os.killpg(proc.pid, signal.SIGTERM)
+        except (AttributeError, OSError):
+            proc.terminate()
+    proc.join()
+    if not ready:
+        return {"error": "timeout"}
+    try:
+        return receiver.recv()
+    except EOFError:
+        return {"error": f"exit code {proc.exitcode}"}
+
+
+def current_commit() -> str | None:
+    """Return the git commit being benchmarked, if there is one."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(
+    sources: list[GraphSpec | str],
+    backends: list[str],
+    warmup: int = 1,
+    repeat: int = 5,
+    memory: bool = True,
+    timeout: float | None = TIMEOUT,
+) -> dict[str, Any]:
+    """Benchmark each backend on each graph, in the order given."""
+    graphs: list[dict[str, Any]] = []
+    results: list[dict[str, Any]] = []
+    failed_at: dict[str, int] = {}
+    for source in sources:
+        dgraph = load_graph(source)
+        size = dgraph.integer_view().num_vertices
+        graph = {
+            "graph": graph_name(source),
+            "vertices": size,
+            "edges": len(dgraph.integer_view().targets),
+        }
+        if isinstance(source, GraphSpec):
+            graph |= {"degree": source.degree, "scc_size": source.scc_size}
+        graphs.append(graph)
+        del dgraph
+        for backend in backends:
+            result: dict[str, Any] = {"graph": graph["graph"], "backend": backend}
+            if size > MAX_VERTICES.get(backend, size):
+                result["error"] = "too big"
+            elif size > failed_at.get(backend, size):
+                result["error"] = "failed on a smaller graph"
+            else:
+                result |= measure_in_process(
+                    backend, source, warmup, repeat, memory, timeout
+                )
+                if "error" in result:
+                    failed_at[backend] = min(size, failed_at.get(backend, size))
+            results.append(result)
+            print(json.dumps(result), file=sys.stderr)
+    return {
+        "commit": current_commit(),
+        "python": platform.python_version(),
+        "warmup": warmup,
+        "repeat": repeat,
+        "memory": memory,
+        "timeout": timeout,
+        "graphs": graphs,
+        "results": results,
+    }
 
+
+def compare(
+    report: dict[str, Any], baseline: dict[str, Any]
+) -> dict[tuple[str, str], float]:
+    """
+    Return how many times slower each backend is on each graph than in a baseline.
+
+    The fastest times are compared, as they vary the least from run to run.
+    """
+    before = {
+        (k["graph"], k["backend"]): k["min"]
+        for k in baseline["results"]
+        if "error" not in k
+    }
+    return {
+        (k["graph"], k["backend"]): k["min"] / before[k["graph"], k["backend"]]
+        for k in report["results"]
+        if "error" not in k and (k["graph"], k["backend"]) in before
+    }
+
+
+def regressions(
+    ratios: dict[tuple[str, str], float], threshold: float = REGRESSION
+) -> list[tuple[str, str]]:
+    """List the graphs and backends that are slower than the threshold allows."""
+    return [key for key, ratio in ratios.items() if ratio > 1 + threshold]
+
+
+def print_tables(
+    report: dict[str, Any],
+    ratios: dict[tuple[str, str], float] | None = None,
+    threshold: float = REGRESSION,
+) -> None:
+    """
+    Show the graphs, times and peak memory, compared with a baseline if given.
+
+    The memory table is left out if the peak memory was not measured.
+    """
+    console = Console()
     graphtable = Table(title="Graphs", box=rich.box.MARKDOWN)
-    graphtable.add_column("File")
+    graphtable.add_column("Graph")
     graphtable.add_column("# vertices", justify="right")
     graphtable.add_column("# edges", justify="right")
-    graphtable.add_column("Execusions per trial", justify="right")
-    for v, k in GRAPH_FILES.items():
-        g = DirectedGraph.read_file(v)
-        graphtable.add_row(
-            v,
-            "{:,}".format(len(g.vertices)),
-            "{:,}".format(sum(len(e) for e in g.edges.values())),
-            "{:,}".format(k[0]),
-        )
+    for g in report["graphs"]:
+        graphtable.add_row(g["graph"], f"{g['vertices']:,}", f"{g['edges']:,}")
     console.print()
     console.print(graphtable)
 
-    table = Table(
-        title="Benchmarks (max of five trials, times in \xb5s/execution)",
-        box=rich.box.MARKDOWN,
+    backends = list(dict.fromkeys(k["backend"] for k in report["results"]))
+    cells = {(k["graph"], k["backend"]): k for k in report["results"]}
+    title = (
+        f"Times (min / median of {report['repeat']} runs, in ms"
+        + (")" if ratios is None else "; ratio to baseline, ! if slower)")
     )
-    table.add_column("Graph")
-    for mod_name in IMPORTS:
-        table.add_column(mod_name, justify="right")
-    for g, (num, exclude_list) in GRAPH_FILES.items():
-        to_output = [g]
-        for mod_name in IMPORTS:
-            if mod_name not in exclude_list:
-                to_output.append(
-                    "{:,}".format(
-                        round(
-                            run_time_test(
-                                TimeTest(f"from {mod_name} import reachable", g),
-                                num,
-                            )
-                            * 1_000_000
-                        )
-                    )
-                )
-            else:
-                to_output.append("-")
-        table.add_row(*to_output)
-    console.print()
-    console.print(table)
+    timetable = Table(title=title, box=rich.box.MARKDOWN)
+    memtable = Table(title="Peak memory (MiB)", box=rich.box.MARKDOWN)
+    for table in [timetable, memtable]:
+        table.add_column("Graph")
+        for backend in backends:
+            table.add_column(backend, justify="right")
+    for g in report["graphs"]:
+        times = [g["graph"]]
+        memory = [g["graph"]]
+        for backend in backends:
+            result = cells.get((g["graph"], backend), {"error": "-"})
+            if "error" in result:
+                times.append(result["error"])
+                memory.append("-")
+                continue
+            text = f"{result['min'] * 1000:,.1f} / {result['median'] * 1000:,.1f}"
+            if ratios is not None and (g["graph"], backend) in ratios:
+                ratio = ratios[g["graph"], backend]
+                text += f" ({ratio:.2f}x{' !' if ratio > 1 + threshold else ''})"
+            times.append(text)
+            peak = result.get("peak_memory")
+            memory.append("-" if peak is None else f"{peak / 2**20:,.1f}")
+        timetable.add_row(*times)
+        memtable.add_row(*memory)
+    # Reports saved before the "memory" key was added always measured it.
+    for table in [timetable, memtable] if report.get("memory", True) else [timetable]:
+        console.print()
+        console.print(table)
+    if ratios is not None:
+        console.print(f"\nRegressions: {len(regressions(ratios, threshold))}")
+
+
+def int_list(text: str) -> list[int]:
+    """Read a comma-separated list of integers."""
+    return [int(k.replace("_", "")) for k in text.split(",")]
+
+
+def float_list(text: str) -> list[float]:
+    """Read a comma-separated list of numbers."""
+    return [float(k) for k in text.split(",")]
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Benchmark the reachable functions.")
+    parser.add_argument("files", nargs="*", help="graph files to benchmark as well")
+    parser.add_argument(
+        "--sizes",
+        type=int_list,
+        default=list(SIZES),
+        help="comma-separated numbers of vertices of the synthetic graphs",
+    )
+    parser.add_argument(
+        "--degrees",
+        type=float_list,
+        default=[DEGREE],
+        help="comma-separated average numbers of edges from each vertex",
+    )
+    parser.add_argument(
+        "--scc-sizes",
+        type=int_list,
+        default=[SCC_SIZE],
+        help="comma-separated sizes of the strongly connected components",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="seed for the graphs")
+    parser.add_argument(
+        "--backends",
+        default=",".join(BACKENDS),
+        help="comma-separated modules with a reachable function",
+    )
+    parser.add_argument("--warmup", type=int, default=1, help="untimed runs first")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs")
+    parser.add_argument(
+        "--timeout", type=float, default=TIMEOUT, help="seconds per backend and graph"
+    )
+    parser.add_argument(
+        "--no-memory", action="store_true", help="skip measuring the peak memory"
+    )
+    parser.add_argument("--output", help="save the results to this JSON file")
+    parser.add_argument("--compare", help="JSON file saved by an earlier run")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=REGRESSION,
+        help="fraction slower than the baseline that counts as a regression",
+    )
+    args = parser.parse_args()
+    sources: list[GraphSpec | str] = sorted(
+        (
+            GraphSpec(size, degree, scc_size, args.seed)
+            for size, degree, scc_size in product(
+                args.sizes, args.degrees, args.scc_sizes
+            )
+        ),
+        key=lambda k: (k.num_vertices, k.degree, k.scc_size),
+    )
+    sources += args.files
+    report = run_benchmark(
+        sources,
+        args.backends.split(","),
+        args.warmup,
+        args.repeat,
+        not args.no_memory,
+        args.timeout,
+    )
+    if args.output:
+        with open(args.output, "wt") as outfile:
+            json.dump(report, outfile, indent=2)
+    ratios = None
+    if args.compare:
+        with open(args.compare, "rt") as infile:
+            ratios = compare(report, json.load(infile))
+    print_tables(report, ratios, args.threshold)
+    if ratios is not None and regressions(ratios, args.threshold):
+        sys.exit(1)
@@ -0,0 +1,76 @@
+# bitmatrix.py
+
+"""Solution to David Amos's weekly coding challenge for 2023-02-13:
+    https://discourse.davidamos.dev/t/flight-inference/135
+
+Like ``matrix.py``, but with each row of the adjacency matrix packed 64 entries
+to a ``uint64`` word, and the closure found with Warshall's algorithm: for each
+vertex k, every row that reaches k gets row k ORed into it.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+from _resources import DirectedGraph, ReachabilityResult, answer_parser, save_answer
+
+
+def adjacency_bits(
+    num_vert: int,
+    sources: np.ndarray,
+    targets: np.ndarray,
+    num_rows: int | None = None,
+) -> np.ndarray:
+    """
+    Pack the edges into a matrix with one bit per vertex pair.
+
+    :param num_rows: Make only this many rows (for the edges from a block of
+        vertices, numbered from 0 within the block).
+    """
+    if num_rows is None:
+        num_rows = num_vert
+    bits = np.zeros((num_rows, (num_vert + 63) // 64), np.uint64)
+    np.bitwise_or.at(
+        bits,
+        (sources, targets >> 6),
+        np.left_shift(np.uint64(1), (targets & 63).astype(np.uint64)),
+    )
+    return bits
+
+
+def closure(bits: np.ndarray) -> np.ndarray:
+    """Replace the packed adjacency matrix with its transitive closure, in place."""
+    for k in range(bits.shape[0]):
+        word, shift = divmod(k, 64)
+        reaches_k = (bits[:, word] >> np.uint64(shift)) & np.uint64(1) != 0
+        if reaches_k.any():
+            bits[reaches_k] |= bits[k]
+    return bits
+
+
+def row_indices(bits: np.ndarray, row: int) -> np.ndarray:
+    """List the columns set in one row of a packed matrix."""
+    unpacked = np.unpackbits(bits[row].view(np.uint8), bitorder="little")
+    return np.flatnonzero(unpacked[: bits.shape[0]])
+
+
+def reachable(dgraph: DirectedGraph) -> ReachabilityResult:
+    """Find which destinations are reachable from a given starting point."""
+    graph = dgraph.integer_view()
+    bits = closure(
+        adjacency_bits(
+            graph.num_vertices,
+            np.frombuffer(graph.sources(), np.int64),
+            np.frombuffer(graph.targets, np.int64),
+        )
+    )
+    return ReachabilityResult.from_packed(
+        graph, (row.tobytes() for row in bits.astype("<u8", copy=False))
+    )
+
+
+if __name__ == "__main__":
+    parser = answer_parser("Find reachability with a bit-packed matrix.")
+    args = parser.parse_args()
+    output = reachable(DirectedGraph.read_file(args.filename))
+    save_answer(output, args.format, args.output)
@@ -0,0 +1,234 @@
+# diskclosure.py
+
+"""Solution to David Amos's weekly coding challenge for 2023-02-13:
+    https://discourse.davidamos.dev/t/flight-inference/135
+
+For graphs whose reachability matrix does not fit in memory. The matrix is kept
+on disk through ``np.memmap``, bit-packed as in ``bitmatrix.py``, and closed
+with a blocked version of Warshall's algorithm: for each block of pivot rows,
+first the pivot rows are closed over those pivots in memory, then every other
+block of rows is read in, updated from the pivot rows, and written back. After
+each pivot block a checkpoint is saved, so an interrupted run picks up where it
+left off (redoing a partly finished block is harmless, as it only ORs in bits
+that are already known to be right).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import zlib
+from collections.abc import Iterator, Mapping
+from typing import Final
+
+import numpy as np
+
+from _resources import (
+    CSRGraph,
+    DirectedGraph,
+    ReachabilityResult,
+    answer_parser,
+    save_answer,
+)
+from bitmatrix import adjacency_bits, row_indices
+
+BLOCK_ROWS: Final[int] = 4096
+
+MATRIX_FILE: Final[str] = "closure.bits"
+
+CHECKPOINT_FILE: Final[str] = "closure.json"
+
+
+def graph_checksum(graph: CSRGraph) -> int:
+    """Identify a graph's edges, so a checkpoint is not used for another graph."""
+    return zlib.crc32(graph.targets.tobytes(), zlib.crc32(graph.offsets.tobytes()))
+
+
+def update_block(rows: np.ndarray, pivots: np.ndarray, first: int) -> bool:
+    """
+    OR each pivot row into the rows that reach it, in place.
+
+    The pivot rows are for vertices ``first``, ``first + 1``, .... Return true
+    if any row changed.
+    """
+    changed = False
+    for k in range(pivots.shape[0]):
+        word, shift = divmod(first + k, 64)
+        reaches_k = (rows[:, word] >> np.uint64(shift)) & np.uint64(1) != 0
+        if reaches_k.any():
+            rows[reaches_k] |= pivots[k]
+            changed = True
+    return changed
+
+
+class DiskClosure(Mapping[str, list[str]]):
+    """
+    The reachability matrix of a graph, stored in a directory.
+
+    It can be used like the dictionary returned by ``reachable``, but each
+    row is only read from disk when it is looked up.
+
+    :param block_rows: The number of rows to keep in memory at once (twice
+        this many are in memory while updating).
+    """
+
+    def __init__(
+        self: DiskClosure,
+        graph: CSRGraph,
+        directory: str,
+        block_rows: int = BLOCK_ROWS,
+    ) -> None:
+        self.graph = graph
+        self.directory = directory
+        self.block_rows = block_rows
+        os.makedirs(directory, exist_ok=True)
+        num_vert = graph.num_vertices
+        shape = (num_vert, (num_vert + 63) // 64)
+        checkpoint = self.read_checkpoint()
+        if checkpoint is None:
+            self.bits = np.memmap(self.matrix_file, np.uint64, "w+", shape=shape)
+            self.next_block = -1
+        else:
+            self.bits = np.memmap(self.matrix_file, np.uint64, "r+", shape=shape)
+            self.next_block = checkpoint["next_block"]
+
+    @property
+    def matrix_file(self: DiskClosure) -> str:
+        """Return the file holding the matrix."""
+        return os.path.join(self.directory, MATRIX_FILE)
+
+    @property
+    def checkpoint_file(self: DiskClosure) -> str:
+        """Return the file recording how far the closure has got."""
+        return os.path.join(self.directory, CHECKPOINT_FILE)
+
+    @property
+    def num_blocks(self: DiskClosure) -> int:
+        """Return the number of blocks of rows."""
+        return -(-self.graph.num_vertices // self.block_rows)
+
+    @property
+    def finished(self: DiskClosure) -> bool:
+        """Return true if the closure is complete."""
+        return self.next_block >= self.num_blocks
+
+    def read_checkpoint(self: DiskClosure) -> dict | None:
+        """Return the saved progress, if it is for this graph and block size."""
+        try:
+            with open(self.checkpoint_file, "rt") as infile:
+                checkpoint = json.load(infile)
+        except (OSError, ValueError):
+            return None
+        if (
+            checkpoint.get("num_vertices") != self.graph.num_vertices
+            or checkpoint.get("checksum") != graph_checksum(self.graph)
+            or checkpoint.get("block_rows") != self.block_rows
+            or not os.path.exists(self.matrix_file)
+        ):
+            return None
+        return checkpoint
+
+    def save_checkpoint(self: DiskClosure) -> None:
+        """Flush the matrix, then record that blocks before ``next_block`` are done."""
+        self.bits.flush()
+        temp_file = self.checkpoint_file + ".tmp"
+        with open(temp_file, "wt") as outfile:
+            json.dump(
+                {
+                    "num_vertices": self.graph.num_vertices,
+                    "checksum": graph_checksum(self.graph),
+                    "block_rows": self.block_rows,
+                    "next_block": self.next_block,
+                },
+                outfile,
+            )
+        os.replace(temp_file, self.checkpoint_file)
+
+    def block(self: DiskClosure, idx: int) -> slice:
+        """Return the rows in a block."""
+        return slice(idx * self.block_rows, (idx + 1) * self.block_rows)
+
+    def fill(self: DiskClosure) -> None:
+        """Write the adjacency matrix, one block of rows at a time."""
+        offsets = np.frombuffer(self.graph.offsets, np.int64)
+        targets = np.frombuffer(self.graph.targets, np.int64)
+        sources = np.frombuffer(self.graph.sources(), np.int64)
+        for idx in range(self.num_blocks):
+            rows = self.block(idx)
+            start = offsets[rows.start]
+            stop = offsets[min(rows.stop, self.graph.num_vertices)]
+            num_rows = min(self.block_rows, self.graph.num_vertices - rows.start)
+            self.bits[rows] = adjacency_bits(
+                self.graph.num_vertices,
+                sources[start:stop] - rows.start,
+                targets[start:stop],
+                num_rows,
+            )
+        self.next_block = 0
+        self.save_checkpoint()
+
+    def run(self: DiskClosure) -> None:
+        """Compute the closure, continuing from the last checkpoint."""
+        if self.next_block < 0:
+            self.fill()
+        while not self.finished:
+            pivot_rows = self.block(self.next_block)
+            pivots = np.array(self.bits[pivot_rows])
+            first = pivot_rows.start
+            update_block(pivots, pivots, first)
+            self.bits[pivot_rows] = pivots
+            for idx in range(self.num_blocks):
+                if idx != self.next_block:
+                    rows = np.array(self.bits[self.block(idx)])
+                    if update_block(rows, pivots, first):
+                        self.bits[self.block(idx)] = rows
+            self.next_block += 1
+            self.save_checkpoint()
+
+    def row(self: DiskClosure, vertex: int) -> np.ndarray:
+        """List the vertices reachable from a vertex (itself included if on a cycle)."""
+        return row_indices(self.bits, vertex)
+
+    def __getitem__(self: DiskClosure, name: str) -> list[str]:
+        """List the destinations reachable from a vertex."""
+        if not self.finished:
+            raise RuntimeError("The closure has not been computed yet.")
+        vertex = self.graph.ids[name]
+        return self.graph.name_list(k for k in self.row(vertex) if k != vertex)
+
+    def __iter__(self: DiskClosure) -> Iterator[str]:
+        """Iterate over the origins."""
+        return iter(self.graph.names)
+
+    def __len__(self: DiskClosure) -> int:
+        """Return the number of origins."""
+        return self.graph.num_vertices
+
+
+def reachable(dgraph: DirectedGraph) -> ReachabilityResult:
+    """Find which destinations are reachable from a given starting point."""
+    graph = dgraph.integer_view()
+    with tempfile.TemporaryDirectory() as directory:
+        closure = DiskClosure(graph, directory)
+        closure.run()
+        output = ReachabilityResult.from_packed(
+            graph, (row.tobytes() for row in closure.bits.astype("<u8", copy=False))
+        )
+        del closure
+    return output
+
+
+if __name__ == "__main__":
+    parser = answer_parser("Find reachability with the matrix on disk.")
+    parser.add_argument(
+        "--directory", required=True, help="where to keep the matrix and checkpoint"
+    )
+    parser.add_argument(
+        "--block-rows", type=int, default=BLOCK_ROWS, help="rows in memory at once"
+    )
+    args = parser.parse_args()
+    data = DirectedGraph.read_file(args.filename)
+    closure = DiskClosure(data.integer_view(), args.directory, args.block_rows)
+    closure.run()
+    save_answer(closure, args.format, args.output)
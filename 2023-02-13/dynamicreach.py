@@ -0,0 +1,149 @@
+# dynamicreach.py
+
+"""Solution to David Amos's weekly coding challenge for 2023-02-13:
+    https://discourse.davidamos.dev/t/flight-inference/135
+
+Reachability that is kept up to date as edges are added and removed, rather
+than worked out again from scratch. Each vertex has a bitset of the vertices it
+reaches and another of the vertices that reach it.
+
+Adding an edge a -> b can only make everything that reaches a (and a itself)
+reach b and everything b reaches, as in Italiano's algorithm. Removing it can
+only change what is reached from a and the vertices that reach a, so just those
+are worked out again with ``sccreach``, using the known results for every other
+vertex.
+"""
+
+from __future__ import annotations
+
+from array import array
+from collections import defaultdict
+
+from _resources import (
+    CSRGraph,
+    DirectedGraph,
+    ReachabilityResult,
+    answer_parser,
+    bit_indices,
+    save_answer,
+)
+from sccreach import reach_bitsets
+
+
+class DynamicReachability:
+    """Answer reachability queries about a graph that changes an edge at a time."""
+
+    def __init__(self: DynamicReachability, dgraph: DirectedGraph) -> None:
+        graph = dgraph.integer_view()
+        self.names = list(graph.names)
+        self.ids = dict(graph.ids)
+        self.successors: list[set[int]] = [
+            set(graph.successors(v)) for v in range(graph.num_vertices)
+        ]
+        self.reach = reach_bitsets(graph)
+        self.reached_by = [0] * graph.num_vertices
+        for v, bits in enumerate(self.reach):
+            for w in bit_indices(bits):
+                self.reached_by[w] |= 1 << v
+
+    def vertex(self: DynamicReachability, name: str) -> int:
+        """Return the number of a vertex, adding it if it is new."""
+        if name not in self.ids:
+            self.ids[name] = len(self.names)
+            self.names.append(name)
+            self.successors.append(set())
+            self.reach.append(0)
+            self.reached_by.append(0)
+        return self.ids[name]
+
+    def add_edge(self: DynamicReachability, origin: str, dest: str) -> None:
+        """Add an edge, and everything it makes reachable."""
+        a, b = self.vertex(origin), self.vertex(dest)
+        if b in self.successors[a]:
+            return
+        self.successors[a].add(b)
+        if (self.reach[a] >> b) & 1:
+            return
+        ancestors = self.reached_by[a] | (1 << a)
+        descendants = self.reach[b] | (1 << b)
+        for x in bit_indices(ancestors):
+            self.reach[x] |= descendants
+        for y in bit_indices(descendants):
+            self.reached_by[y] |= ancestors
+
+    def remove_edge(self: DynamicReachability, origin: str, dest: str) -> None:
+        """
+        Remove an edge, and whatever could only be reached through it.
+
+        :raises KeyError: If there is no such edge.
+        """
+        a, b = self.ids[origin], self.ids[dest]
+        if b not in self.successors[a]:
+            raise KeyError(f"No edge from {origin} to {dest}")
+        self.successors[a].remove(b)
+        # Only a and the vertices that reach it can have used the edge.
+        region = bit_indices(self.reached_by[a] | (1 << a))
+        local = {v: k for k, v in enumerate(region)}
+        offsets = array("q", [0])
+        targets = array("q")
+        outside = [0] * len(region)
+        for k, v in enumerate(region):
+            for w in self.successors[v]:
+                if w in local:
+                    targets.append(local[w])
+                else:
+                    outside[k] |= self.reach[w] | (1 << w)
+            offsets.append(len(targets))
+        subgraph = CSRGraph([self.names[v] for v in region], {}, offsets, targets)
+        for v, bits in zip(region, reach_bitsets(subgraph, region, outside)):
+            for w in bit_indices(self.reach[v] & ~bits):
+                self.reached_by[w] &= ~(1 << v)
+            self.reach[v] = bits
+
+    def reaches(self: DynamicReachability, origin: str, dest: str) -> bool:
+        """Return true if there is a route from one vertex to another."""
+        return bool((self.reach[self.ids[origin]] >> self.ids[dest]) & 1)
+
+    def destinations(self: DynamicReachability, origin: str) -> list[str]:
+        """List the destinations reachable from a vertex."""
+        v = self.ids[origin]
+        return [self.names[k] for k in bit_indices(self.reach[v] & ~(1 << v))]
+
+    def as_dict(self: DynamicReachability) -> dict[str, list[str]]:
+        """Return the destinations from every vertex, as ``reachable`` does."""
+        return {name: self.destinations(name) for name in self.names}
+
+    def result(self: DynamicReachability) -> ReachabilityResult:
+        """Return the destinations from every vertex, as they now stand."""
+        return ReachabilityResult(list(self.names), dict(self.ids), self.reach)
+
+    def to_graph(self: DynamicReachability) -> DirectedGraph:
+        """Return the graph as it now stands."""
+        edges: defaultdict[str, list[str]] = defaultdict(list)
+        for v, succ in enumerate(self.successors):
+            edges[self.names[v]].extend(self.names[w] for w in sorted(succ))
+        return DirectedGraph(list(self.names), edges)
+
+
+def reachable(dgraph: DirectedGraph) -> ReachabilityResult:
+    """Find which destinations are reachable from a given starting point."""
+    return DynamicReachability(dgraph).result()
+
+
+if __name__ == "__main__":
+    parser = answer_parser("Find reachability, then keep it up to date.")
+    parser.add_argument(
+        "changes",
+        nargs="*",
+        metavar="CHANGE",
+        help='edges to add ("+A B") or remove ("-A B"), in turn',
+    )
+    args = parser.parse_args()
+    index = DynamicReachability(DirectedGraph.read_file(args.filename))
+    for change in args.changes:
+        origin, dest = change[1:].split()
+        if change.startswith("-"):
+            index.remove_edge(origin, dest)
+        else:
+            index.add_edge(origin, dest)
+    save_answer(index.result(), args.format, args.output)
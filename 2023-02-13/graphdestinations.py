@@ -4,31 +4,31 @@
     https://discourse.davidamos.dev/t/flight-inference/135
 """
 
-from collections import defaultdict
-from sys import argv
-
-from _resources import DirectedGraph, format_answer
+from _resources import DirectedGraph, answer_parser, save_answer
 
 
 def reachable(dgraph: DirectedGraph) -> dict[str, list[str]]:
     """Find which destinations are reachable from a given starting point."""
-    output: dict[str, list[str]] = defaultdict(list)
-    for origin in dgraph.vertices:
-        visited = {vertex: False for vertex in dgraph.vertices}
+    graph = dgraph.integer_view()
+    output: dict[str, list[str]] = {}
+    for origin in range(graph.num_vertices):
+        visited = bytearray(graph.num_vertices)
         visited[origin] = True
-        places_to_go: list[str] = [origin]
+        found: list[int] = []
+        places_to_go: list[int] = [origin]
         while places_to_go:
             v = places_to_go.pop()
-            for v2 in dgraph.edges[v]:
-                output[origin].append(v2)
+            for v2 in graph.successors(v):
                 if not visited[v2]:
+                    visited[v2] = True
+                    found.append(v2)
                     places_to_go.append(v2)
-            visited[v] = True
-    return {v: list(set([k for k in output[v] if k != v])) for v in dgraph.vertices}
+        output[graph.names[origin]] = graph.name_list(found)
+    return output
 
 
 if __name__ == "__main__":
-    if len(argv) > 1:
-        data = DirectedGraph.read_file(argv[1])
-        output = reachable(data)
-        print(format_answer(output))
+    parser = answer_parser("Find the destinations reachable from each vertex.")
+    args = parser.parse_args()
+    output = reachable(DirectedGraph.read_file(args.filename))
+    save_answer(output, args.format, args.output)
@@ -2,11 +2,24 @@
 from __future__ import annotations
 
 import random
+import sys
+from array import array
+from argparse import ArgumentParser
 from collections.abc import Sequence
 from dataclasses import dataclass
 from math import fsum
+from typing import Final, TextIO
 
-from _resources import DirectedGraph
+import numpy as np
+
+from _resources import CSRGraph, DirectedGraph
+
+# The number of random pairs of nodes to weigh up for each edge, when there are
+# too many pairs to consider them all.
+CANDIDATES_PER_EDGE: Final[int] = 20
+
+# The number of edges to format and write at once.
+WRITE_CHUNK: Final[int] = 100_000
 
 
 @dataclass(frozen=True)
@@ -48,26 +61,144 @@ class Node:
             ]
         )
         target_sum = fsum(a[0] for a in attractions) / num_edges
-        edge_pools: list[list[tuple[int, int]]] = [[]] * num_edges
-        pool_sums = [0] * num_edges
+        edge_pools: list[list[tuple[int, int]]] = [[] for _ in range(num_edges)]
+        pool_sums = [0.0] * num_edges
         for idx, a in enumerate(attractions):
             for p in range(num_edges):
+                # Leave at least one pair for each of the pools after this one.
                 if ((ps := pool_sums[p]) == 0 or ps + a[0] < target_sum) and (
-                    len(attractions) - idx <= num_edges - p
+                    len(attractions) - idx >= num_edges - p
                 ):
                     edge_pools[p].append((a[1], a[2]))
+                    pool_sums[p] += a[0]
                     break
 
         edges_raw = [
-            (node_list[(e := random.choice(p))[0]], node_list[e[1]]) for p in edge_pools
+            (node_list[(e := random.choice(p))[0]], node_list[e[1]])
+            for p in edge_pools
+            if p
         ]
         edges = [random.choice([(p[1], p[0]), p]) for p in edges_raw]
-        edge_dict = {k: [e[1] for e in edges if e[0] == k] for k in node_list}
+        edge_dict: dict[str, list[str]] = {k: [] for k in node_list}
+        for origin, dest in edges:
+            edge_dict[origin].append(dest)
         return DirectedGraph(node_list, edge_dict)
 
 
+def random_pairs(
+    num_nodes: int, num_pairs: int, rng: np.random.Generator
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Return up to ``num_pairs`` different pairs of nodes ``j > k``.
+
+    All of the pairs are returned if there are no more than that, and otherwise
+    pairs are drawn uniformly at random (and repeats dropped).
+    """
+    if num_nodes * (num_nodes - 1) // 2 <= num_pairs:
+        return np.tril_indices(num_nodes, -1)
+    ends = rng.integers(0, num_nodes, (num_pairs, 2))
+    ends = ends[ends[:, 0] != ends[:, 1]]
+    codes = np.sort(ends.max(axis=1) * num_nodes + ends.min(axis=1))
+    codes = codes[np.concatenate([[True], codes[1:] != codes[:-1]])]
+    return codes // num_nodes, codes % num_nodes
+
+
+def random_edges(
+    num_nodes: int,
+    num_edges: int,
+    seed: int | None = None,
+    num_candidates: int | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Return the sources and targets of the edges of a random graph.
+
+    The nodes are made as in ``Node.random_node``, and edges are drawn without
+    replacement from pairs of nodes, with chances in proportion to their
+    attraction (pairs that repel each other are never joined), each pointing
+    either way at random. Rather than every pair, ``num_candidates`` random
+    pairs are weighed up, by default ``CANDIDATES_PER_EDGE`` for each edge.
+    """
+    rng = np.random.default_rng(seed)
+    location = rng.standard_normal((num_nodes, 4))
+    importance = rng.standard_normal(num_nodes)
+    perturbation = rng.standard_normal(num_nodes) / 1_000
+    if num_candidates is None:
+        num_candidates = CANDIDATES_PER_EDGE * num_edges
+    j, k = random_pairs(num_nodes, num_candidates, rng)
+    squared_dist = ((location[j] - location[k]) ** 2).sum(axis=1) + (
+        perturbation[j] * perturbation[k]
+    )
+    attraction = importance[j] * importance[k] / squared_dist
+    keep = attraction > 0
+    j, k, attraction = j[keep], k[keep], attraction[keep]
+    # Weighted sampling without replacement (Efraimidis and Spirakis, 2006):
+    # take the pairs with the largest u ** (1 / attraction), for uniform u.
+    keys = np.log(rng.random(len(attraction))) / attraction
+    num_chosen = min(num_edges, len(keys))
+    chosen = np.arange(num_chosen)
+    if num_chosen < len(keys):
+        chosen = np.argpartition(-keys, num_chosen)[:num_chosen]
+    flip = rng.random(num_chosen) < 0.5
+    sources = np.where(flip, k[chosen], j[chosen])
+    targets = np.where(flip, j[chosen], k[chosen])
+    order = np.lexsort((targets, sources))
+    return sources[order], targets[order]
+
+
+def node_names(num_nodes: int) -> list[str]:
+    """Name the nodes as ``Node.random_graph`` does."""
+    id_len = len(str(num_nodes))
+    return [f"v{k:0{id_len}d}" for k in range(num_nodes)]
+
+
+def edges_graph(
+    num_nodes: int, sources: np.ndarray, targets: np.ndarray
+) -> DirectedGraph:
+    """Make a graph from edges sorted by source, as ``random_edges`` gives them."""
+    names = node_names(num_nodes)
+    offsets = np.zeros(num_nodes + 1, np.int64)
+    np.cumsum(np.bincount(sources, minlength=num_nodes), out=offsets[1:])
+    graph = CSRGraph(
+        names,
+        {name: k for k, name in enumerate(names)},
+        array("q", offsets.tobytes()),
+        array("q", targets.astype(np.int64).tobytes()),
+    )
+    return DirectedGraph.from_csr(graph)
+
+
+def write_edges(
+    outfile: TextIO, num_nodes: int, sources: np.ndarray, targets: np.ndarray
+) -> None:
+    """Write edges a line each, in ``DirectedGraph.output_graph``'s order."""
+    names = np.array(node_names(num_nodes))
+    for start in range(0, len(sources), WRITE_CHUNK):
+        stop = start + WRITE_CHUNK
+        lines = np.char.add(
+            np.char.add(names[sources[start:stop]], " "), names[targets[start:stop]]
+        )
+        outfile.write("\n".join(lines.tolist()) + "\n")
+
+
 if __name__ == "__main__":
-    for k in range(4):
-        g = Node.random_graph(25, 20)
-        with open(f"random_{k}.txt", "wt") as outfile:
-            outfile.write(g.output_graph())
+    if len(sys.argv) > 1:
+        parser = ArgumentParser(description="Make a large random graph.")
+        parser.add_argument("num_nodes", type=int, help="number of nodes")
+        parser.add_argument("num_edges", type=int, help="number of edges")
+        parser.add_argument("--seed", type=int, help="seed for the random numbers")
+        parser.add_argument(
+            "--candidates", type=int, help="random pairs of nodes to choose from"
+        )
+        parser.add_argument("--output", help="file to write (default: stdout)")
+        args = parser.parse_args()
+        edges = random_edges(args.num_nodes, args.num_edges, args.seed, args.candidates)
+        if args.output is None:
+            write_edges(sys.stdout, args.num_nodes, *edges)
+        else:
+            with open(args.output, "wt") as outfile:
+                write_edges(outfile, args.num_nodes, *edges)
+    else:
+        for k in range(4):
+            g = Node.random_graph(25, 20)
+            with open(f"random_{k}.txt", "wt") as outfile:
+                outfile.write(g.output_graph())
@@ -0,0 +1,124 @@
+# parallelreach.py
+
+"""Solution to David Amos's weekly coding challenge for 2023-02-13:
+    https://discourse.davidamos.dev/t/flight-inference/135
+
+The search of ``graphdestinations.py``, spread over several processes. The
+graph's offset and target arrays go in shared memory, along with an output
+matrix of one bit per vertex pair. Each worker takes chunks of origins, and
+writes a row of bits for each straight into the output, so nothing but the
+chunk bounds passes between processes.
+"""
+
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import Final
+
+import numpy as np
+
+from _resources import DirectedGraph, ReachabilityResult, answer_parser, save_answer
+
+CHUNKS_PER_WORKER: Final[int] = 4
+
+_offsets: memoryview | None = None
+
+_targets: memoryview | None = None
+
+_output: memoryview | None = None
+
+_blocks: list[SharedMemory] = []
+
+
+def _init_worker(names: tuple[str, str, str], num_vert: int, num_edges: int) -> None:
+    """Attach to the shared arrays."""
+    global _offsets, _targets, _output
+    _blocks.extend(SharedMemory(name) for name in names)
+    _offsets = _blocks[0].buf.cast("q")[: num_vert + 1]
+    _targets = _blocks[1].buf.cast("q")[:num_edges]
+    _output = _blocks[2].buf
+
+
+def _search(start: int, stop: int) -> None:
+    """Find what each origin from ``start`` up to ``stop`` reaches."""
+    assert _offsets is not None and _targets is not None and _output is not None
+    offsets, targets, output = _offsets, _targets, _output
+    num_vert = len(offsets) - 1
+    row_bytes = (num_vert + 7) // 8
+    for origin in range(start, stop):
+        visited = bytearray(num_vert)
+        visited[origin] = True
+        row = bytearray(row_bytes)
+        places_to_go = [origin]
+        while places_to_go:
+            v = places_to_go.pop()
+            for pos in range(offsets[v], offsets[v + 1]):
+                v2 = targets[pos]
+                if not visited[v2]:
+                    visited[v2] = True
+                    row[v2 >> 3] |= 1 << (v2 & 7)
+                    places_to_go.append(v2)
+        output[origin * row_bytes : (origin + 1) * row_bytes] = row
+
+
+def reach_rows(dgraph: DirectedGraph, workers: int | None = None) -> np.ndarray:
+    """
+    Return a matrix with a row of packed bits for each origin.
+
+    Bit ``k % 8`` of byte ``k // 8`` in row ``j`` is set if vertex ``j``
+    reaches vertex ``k`` (other than itself).
+    """
+    graph = dgraph.integer_view()
+    num_vert = graph.num_vertices
+    row_bytes = (num_vert + 7) // 8
+    if workers is None:
+        workers = os.cpu_count() or 1
+    blocks = [
+        SharedMemory(create=True, size=max(size, 1))
+        for size in [
+            graph.offsets.itemsize * len(graph.offsets),
+            graph.targets.itemsize * len(graph.targets),
+            num_vert * row_bytes,
+        ]
+    ]
+    try:
+        blocks[0].buf[: len(graph.offsets) * 8] = graph.offsets.tobytes()
+        blocks[1].buf[: len(graph.targets) * 8] = graph.targets.tobytes()
+        chunk = max(1, -(-num_vert // (workers * CHUNKS_PER_WORKER)))
+        starts = range(0, num_vert, chunk)
+        with ProcessPoolExecutor(
+            workers,
+            initializer=_init_worker,
+            initargs=(
+                tuple(k.name for k in blocks),
+                num_vert,
+                len(graph.targets),
+            ),
+        ) as pool:
+            list(pool.map(_search, starts, [min(k + chunk, num_vert) for k in starts]))
+        shared = np.ndarray((num_vert, row_bytes), np.uint8, blocks[2].buf)
+        rows = shared.copy()
+        # The shared memory cannot be closed while an array still points into it.
+        del shared
+        return rows
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+def reachable(dgraph: DirectedGraph, workers: int | None = None) -> ReachabilityResult:
+    """Find which destinations are reachable from a given starting point."""
+    rows = reach_rows(dgraph, workers)
+    return ReachabilityResult.from_packed(
+        dgraph.integer_view(), (row.tobytes() for row in rows)
+    )
+
+
+if __name__ == "__main__":
+    parser = answer_parser("Find reachability with several processes.")
+    args = parser.parse_args()
+    output = reachable(DirectedGraph.read_file(args.filename))
+    save_answer(output, args.format, args.output)
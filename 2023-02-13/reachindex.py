@@ -0,0 +1,185 @@
+# reachindex.py
+
+"""Solution to David Amos's weekly coding challenge for 2023-02-13:
+    https://discourse.davidamos.dev/t/flight-inference/135
+
+An index for asking whether one vertex reaches another, without working out
+every reachable pair. The graph is shrunk to its strongly connected components
+(see ``sccreach``), and each component gets interval labels, as in GRAIL (Yildirim,
+Chaoji and Zaki, 2010): a depth-first search of the components numbers them in
+the order they finish, and each gets the range from the smallest number below it
+to its own. If one component reaches another, the second range lies inside the
+first, so most pairs that are not connected are ruled out at once. The first
+search also gives a spanning forest, and pairs in the same tree of it are known
+to be connected. Anything else is settled by a search that skips every
+component whose ranges rule it out.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+from random import Random
+from typing import Final
+
+from _resources import DirectedGraph, answer_parser, save_answer
+from sccreach import strong_components
+
+NUM_LABELS: Final[int] = 3
+
+
+class ReachIndex:
+    """
+    Answer whether one vertex reaches another, in close to constant time.
+
+    :param num_labels: The number of interval labellings; more rule out more
+        pairs, at the cost of time and memory to build.
+    :param seed: Seed for the random orders of the later labellings.
+    """
+
+    def __init__(
+        self: ReachIndex,
+        dgraph: DirectedGraph,
+        num_labels: int = NUM_LABELS,
+        seed: int | None = None,
+    ) -> None:
+        graph = dgraph.integer_view()
+        self.names = graph.names
+        self.ids = graph.ids
+        self.component, num_components = strong_components(graph)
+        self.members: list[list[int]] = [[] for _ in range(num_components)]
+        for v, comp in enumerate(self.component):
+            self.members[comp].append(v)
+        children: list[set[int]] = [set() for _ in range(num_components)]
+        self.cyclic = [False] * num_components
+        for v, comp in enumerate(self.component):
+            for w in graph.successors(v):
+                if self.component[w] == comp:
+                    self.cyclic[comp] = True
+                else:
+                    children[comp].add(self.component[w])
+        self.children = [sorted(k) for k in children]
+        rng = Random(seed)
+        self.lows: list[list[int]] = []
+        self.posts: list[list[int]] = []
+        self.tree_lows: list[int] = []
+        for idx in range(num_labels):
+            self.label(None if idx == 0 else rng)
+
+    def label(self: ReachIndex, rng: Random | None) -> None:
+        """Add an interval labelling, from a search in random order if ``rng``."""
+        num_components = len(self.children)
+        low = [0] * num_components
+        post = [0] * num_components
+        tree_low = [0] * num_components
+        visited = bytearray(num_components)
+        counter = 0
+        roots = list(range(num_components - 1, -1, -1))
+        if rng is not None:
+            rng.shuffle(roots)
+        for root in roots:
+            if visited[root]:
+                continue
+            visited[root] = True
+            tree_low[root] = counter
+            stack = [(root, self.ordered(self.children[root], rng))]
+            while stack:
+                comp, todo = stack[-1]
+                for child in todo:
+                    if not visited[child]:
+                        visited[child] = True
+                        tree_low[child] = counter
+                        stack.append((child, self.ordered(self.children[child], rng)))
+                        break
+                else:
+                    stack.pop()
+                    low[comp] = min([counter] + [low[k] for k in self.children[comp]])
+                    post[comp] = counter
+                    counter += 1
+        self.lows.append(low)
+        self.posts.append(post)
+        if not self.tree_lows:
+            self.tree_lows = tree_low
+
+    @staticmethod
+    def ordered(children: list[int], rng: Random | None) -> Iterator[int]:
+        """Iterate over the children in order, or in random order if ``rng``."""
+        if rng is None:
+            return iter(children)
+        return iter(rng.sample(children, len(children)))
+
+    def may_reach(self: ReachIndex, source: int, target: int) -> bool:
+        """Return false if the labels show one component cannot reach another."""
+        return all(
+            low[source] <= low[target] and post[target] <= post[source]
+            for low, post in zip(self.lows, self.posts)
+        )
+
+    def component_reaches(self: ReachIndex, source: int, target: int) -> bool:
+        """Return true if one component reaches another (or itself, by a cycle)."""
+        if source == target:
+            return self.cyclic[source]
+        # Tarjan's algorithm numbers components so that edges lead to lower ones.
+        if source < target or not self.may_reach(source, target):
+            return False
+        visited = {source}
+        stack = [source]
+        post, tree_low = self.posts[0], self.tree_lows
+        while stack:
+            comp = stack.pop()
+            if tree_low[comp] <= post[target] <= post[comp]:
+                return True
+            for child in self.children[comp]:
+                if child not in visited and self.may_reach(child, target):
+                    visited.add(child)
+                    stack.append(child)
+        return False
+
+    def reaches(self: ReachIndex, origin: str, dest: str) -> bool:
+        """Return true if there is a route from one vertex to another."""
+        a, b = self.ids[origin], self.ids[dest]
+        if a != b and self.component[a] == self.component[b]:
+            return True
+        return self.component_reaches(self.component[a], self.component[b])
+
+    def destinations(self: ReachIndex, origin: str) -> Iterator[str]:
+        """Yield the destinations reachable from a vertex, one at a time."""
+        a = self.ids[origin]
+        start = self.component[a]
+        if self.cyclic[start]:
+            yield from (self.names[v] for v in self.members[start] if v != a)
+        visited = {start}
+        stack = list(self.children[start])
+        visited.update(stack)
+        while stack:
+            comp = stack.pop()
+            yield from (self.names[v] for v in self.members[comp])
+            for child in self.children[comp]:
+                if child not in visited:
+                    visited.add(child)
+                    stack.append(child)
+
+
+def reachable(dgraph: DirectedGraph) -> dict[str, list[str]]:
+    """Find which destinations are reachable from a given starting point."""
+    index = ReachIndex(dgraph)
+    return {name: list(index.destinations(name)) for name in index.names}
+
+
+if __name__ == "__main__":
+    parser = answer_parser("Find reachability with an interval label index.")
+    parser.add_argument(
+        "pair",
+        nargs="*",
+        metavar="VERTEX",
+        help="two vertices, to ask only whether the second is reached from the first",
+    )
+    args = parser.parse_args()
+    if len(args.pair) not in (0, 2):
+        parser.error("give two vertices, or none")
+    index = ReachIndex(DirectedGraph.read_file(args.filename))
+    if args.pair:
+        print("yes" if index.reaches(*args.pair) else "no")
+    else:
+        # Each origin's destinations are only found when its line is written.
+        output = {k: index.destinations(k) for k in index.names}
+        save_answer(output, args.format, args.output)
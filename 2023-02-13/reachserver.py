@@ -0,0 +1,263 @@
+# reachserver.py
+
+"""Solution to David Amos's weekly coding challenge for 2023-02-13:
+    https://discourse.davidamos.dev/t/flight-inference/135
+
+A server that keeps a graph loaded, so that questions about it are answered
+without reading the file and working everything out again each time. It holds
+a ``reachindex.ReachIndex`` of the graph, and remembers recent answers in an
+LRU cache. Every few seconds it checks whether the file has changed, and if so
+builds a new index in another thread, answering from the old one until the new
+one is ready.
+
+Clients connect over TCP on localhost (or a Unix socket) and send one JSON
+object per line: ``{"origin": "A"}`` asks for the destinations reachable from
+A, and ``{"origin": "A", "dest": "B"}`` asks whether B is reachable from A.
+Each gets one line of JSON back, in the order they were sent.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import sys
+from argparse import ArgumentParser
+from collections.abc import Callable, Sequence
+from functools import lru_cache
+from time import perf_counter
+from typing import Final
+
+from _resources import DirectedGraph
+from reachindex import ReachIndex
+
+HOST: Final[str] = "127.0.0.1"
+
+PORT: Final[int] = 7213
+
+CACHE_SIZE: Final[int] = 4096
+
+POLL_SECONDS: Final[float] = 2.0
+
+# Connections that can wait to be accepted, so bursts of clients are not refused.
+BACKLOG: Final[int] = 4096
+
+# Answers can be long lists of names, longer than the default line limit.
+LINE_LIMIT: Final[int] = 2**26
+
+
+class ReachService:
+    """
+    Answer queries about the graph in a file, reloading it when it changes.
+
+    :param cache_size: The number of answers to remember, for each kind of query.
+    """
+
+    def __init__(
+        self: ReachService, filename: str, cache_size: int = CACHE_SIZE
+    ) -> None:
+        self.filename = filename
+        self.cache_size = cache_size
+        self.stamp = self.file_stamp()
+        self.use(ReachIndex(DirectedGraph.read_file(filename)))
+
+    def file_stamp(self: ReachService) -> tuple[int, int]:
+        """Return the size and modification time of the file."""
+        stat = os.stat(self.filename)
+        return stat.st_size, stat.st_mtime_ns
+
+    def use(self: ReachService, index: ReachIndex) -> None:
+        """Answer from a new index, with empty caches."""
+        self.index = index
+        self.destinations: Callable[[str], list[str]] = lru_cache(self.cache_size)(
+            lambda origin: sorted(index.destinations(origin))
+        )
+        self.reaches: Callable[[str, str], bool] = lru_cache(self.cache_size)(
+            index.reaches
+        )
+
+    async def watch(self: ReachService, interval: float = POLL_SECONDS) -> None:
+        """Reload the graph whenever the file changes."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                stamp = self.file_stamp()
+                if stamp == self.stamp:
+                    continue
+                dgraph = await asyncio.to_thread(DirectedGraph.read_file, self.filename)
+                index = await asyncio.to_thread(ReachIndex, dgraph)
+            except (OSError, ValueError) as err:
+                # The file may be missing or half written; try again later.
+                print(f"Not reloading {self.filename}: {err}", file=sys.stderr)
+                continue
+            self.stamp = stamp
+            self.use(index)
+            print(f"Reloaded {self.filename}", file=sys.stderr)
+
+    def answer(self: ReachService, line: bytes) -> dict:
+        """Answer one query."""
+        try:
+            query = json.loads(line)
+            origin = query["origin"]
+            if "dest" in query:
+                dest = query["dest"]
+                reaches = self.reaches(origin, dest)
+                return {"origin": origin, "dest": dest, "reaches": reaches}
+            return {"origin": origin, "destinations": self.destinations(origin)}
+        except KeyError as err:
+            return {"error": f"Unknown vertex or missing field: {err}"}
+        except (ValueError, TypeError) as err:
+            return {"error": f"Bad query: {err}"}
+
+    async def handle(
+        self: ReachService, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Answer the queries from one connection until it closes."""
+        try:
+            while line := await reader.readline():
+                if line.strip():
+                    writer.write(json.dumps(self.answer(line)).encode() + b"\n")
+                    await writer.drain()
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+
+async def serve(
+    filename: str,
+    host: str = HOST,
+    port: int = PORT,
+    socket_path: str | None = None,
+    cache_size: int = CACHE_SIZE,
+    interval: float = POLL_SECONDS,
+) -> None:
+    """Load a graph and answer queries about it until stopped."""
+    service = ReachService(filename, cache_size)
+    if socket_path is not None:
+        server = await asyncio.start_unix_server(
+            service.handle, socket_path, backlog=BACKLOG
+        )
+        print(f"Serving {filename} on {socket_path}", file=sys.stderr)
+    else:
+        server = await asyncio.start_server(service.handle, host, port, backlog=BACKLOG)
+        print(f"Serving {filename} on {host}:{port}", file=sys.stderr)
+    watcher = asyncio.create_task(service.watch(interval))
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        watcher.cancel()
+
+
+async def connect(
+    host: str = HOST, port: int = PORT, socket_path: str | None = None
+) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    """Connect to a server."""
+    if socket_path is not None:
+        return await asyncio.open_unix_connection(socket_path, limit=LINE_LIMIT)
+    return await asyncio.open_connection(host, port, limit=LINE_LIMIT)
+
+
+async def query(
+    queries: Sequence[dict],
+    host: str = HOST,
+    port: int = PORT,
+    socket_path: str | None = None,
+) -> list[dict]:
+    """Send queries over one connection, and return the answers in order."""
+    reader, writer = await connect(host, port, socket_path)
+    try:
+        writer.write(b"".join(json.dumps(k).encode() + b"\n" for k in queries))
+        await writer.drain()
+        return [json.loads(await reader.readline()) for _ in queries]
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def query_many(
+    queries: Sequence[dict],
+    connections: int,
+    host: str = HOST,
+    port: int = PORT,
+    socket_path: str | None = None,
+) -> list[dict]:
+    """Split queries among several connections at once, and return the answers."""
+    parts = await asyncio.gather(
+        *(
+            query(queries[k::connections], host, port, socket_path)
+            for k in range(connections)
+        )
+    )
+    # Put each answer back in the place of its query.
+    answers: list[dict] = [{}] * len(queries)
+    for k, part in enumerate(parts):
+        answers[k::connections] = part
+    return answers
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Answer reachability queries about a graph.")
+    parser.add_argument("--host", default=HOST, help="address to serve or connect on")
+    parser.add_argument("--port", type=int, default=PORT, help="port to use")
+    parser.add_argument("--socket", help="use this Unix socket instead of TCP")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_parser = commands.add_parser("serve", help="run the server")
+    serve_parser.add_argument("filename", help="file with the edges of the graph")
+    serve_parser.add_argument(
+        "--cache-size", type=int, default=CACHE_SIZE, help="answers to remember"
+    )
+    serve_parser.add_argument(
+        "--poll", type=float, default=POLL_SECONDS, help="seconds between checks"
+    )
+    query_parser = commands.add_parser("query", help="ask a running server")
+    query_parser.add_argument("origin", help="where to start")
+    query_parser.add_argument("dest", nargs="?", help="where to go, if asking a pair")
+    query_parser.add_argument(
+        "--repeat", type=int, default=1, help="send the query this many times"
+    )
+    query_parser.add_argument(
+        "--connections", type=int, default=1, help="connections to send them over"
+    )
+    args = parser.parse_args()
+    if args.command == "serve":
+        try:
+            asyncio.run(
+                serve(
+                    args.filename,
+                    args.host,
+                    args.port,
+                    args.socket,
+                    args.cache_size,
+                    args.poll,
+                )
+            )
+        except KeyboardInterrupt:
+            pass
+    else:
+        request = {"origin": args.origin}
+        if args.dest is not None:
+            request["dest"] = args.dest
+        start = perf_counter()
+        answers = asyncio.run(
+            query_many(
+                [request] * args.repeat,
+                args.connections,
+                args.host,
+                args.port,
+                args.socket,
+            )
+        )
+        elapsed = perf_counter() - start
+        print(json.dumps(answers[0]))
+        if args.repeat > 1:
+            print(
+                f"{len(answers)} answers in {elapsed:.3f} s"
+                f" ({len(answers) / elapsed:.0f} per second)",
+                file=sys.stderr,
+            )
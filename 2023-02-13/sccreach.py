@@ -0,0 +1,126 @@
+# sccreach.py
+
+"""Solution to David Amos's weekly coding challenge for 2023-02-13:
+    https://discourse.davidamos.dev/t/flight-inference/135
+
+Every vertex in a strongly connected component reaches the same places, so the
+components are found first (with Tarjan's algorithm, written without recursion)
+and reachability is worked out once per component. Tarjan's algorithm finishes
+each component only after every component it leads to, so the reachable sets
+can be built up in that order, stored as Python ints used as bitsets.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+from _resources import (
+    CSRGraph,
+    DirectedGraph,
+    ReachabilityResult,
+    answer_parser,
+    save_answer,
+)
+
+
+def strong_components(graph: CSRGraph) -> tuple[list[int], int]:
+    """
+    Find the strongly connected components of a graph.
+
+    Return the component of each vertex and the number of components.
+    Components are numbered in the order Tarjan's algorithm finishes them, so
+    every edge goes from a component to itself or to one with a smaller number.
+    """
+    num_vert = graph.num_vertices
+    offsets, targets = graph.offsets, graph.targets
+    index = [-1] * num_vert
+    lowlink = [0] * num_vert
+    component = [-1] * num_vert
+    stack: list[int] = []
+    num_components = 0
+    counter = 0
+    for root in range(num_vert):
+        if index[root] != -1:
+            continue
+        # Each frame is a vertex and the position of the next edge to follow.
+        frames = [(root, offsets[root])]
+        index[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        while frames:
+            v, pos = frames[-1]
+            end = offsets[v + 1]
+            while pos < end:
+                w = targets[pos]
+                pos += 1
+                if index[w] == -1:
+                    frames[-1] = (v, pos)
+                    frames.append((w, offsets[w]))
+                    index[w] = lowlink[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    break
+                if component[w] == -1 and index[w] < lowlink[v]:
+                    lowlink[v] = index[w]
+            else:
+                frames.pop()
+                if lowlink[v] == index[v]:
+                    while True:
+                        w = stack.pop()
+                        component[w] = num_components
+                        if w == v:
+                            break
+                    num_components += 1
+                if frames and lowlink[v] < lowlink[frames[-1][0]]:
+                    lowlink[frames[-1][0]] = lowlink[v]
+    return component, num_components
+
+
+def reach_bitsets(
+    graph: CSRGraph,
+    bit_of: Sequence[int] | None = None,
+    outside: Sequence[int] | None = None,
+) -> list[int]:
+    """
+    Find the vertices reachable from each vertex, including itself if on a cycle.
+
+    :param bit_of: The bit standing for each vertex (by default, its number).
+    :param outside: For each vertex, bits for anything else it is known to
+        reach (such as places reached by edges left out of the graph).
+    """
+    component, num_components = strong_components(graph)
+    members = [0] * num_components
+    known = [0] * num_components
+    for v, comp in enumerate(component):
+        members[comp] |= 1 << (v if bit_of is None else bit_of[v])
+        if outside is not None:
+            known[comp] |= outside[v]
+    successors: list[set[int]] = [set() for _ in range(num_components)]
+    cyclic = [False] * num_components
+    for v in range(graph.num_vertices):
+        comp = component[v]
+        for w in graph.successors(v):
+            if component[w] == comp:
+                cyclic[comp] = True
+            else:
+                successors[comp].add(component[w])
+    reach = [0] * num_components
+    for comp in range(num_components):
+        bits = known[comp] | (members[comp] if cyclic[comp] else 0)
+        for succ in successors[comp]:
+            bits |= reach[succ] | members[succ]
+        reach[comp] = bits
+    return [reach[comp] for comp in component]
+
+
+def reachable(dgraph: DirectedGraph) -> ReachabilityResult:
+    """Find which destinations are reachable from a given starting point."""
+    graph = dgraph.integer_view()
+    return ReachabilityResult(graph.names, graph.ids, reach_bitsets(graph))
+
+
+if __name__ == "__main__":
+    parser = answer_parser("Find reachability through strongly connected components.")
+    args = parser.parse_args()
+    output = reachable(DirectedGraph.read_file(args.filename))
+    save_answer(output, args.format, args.output)
@@ -1,18 +1,46 @@
 # test.py
 
+import asyncio
+import gzip
+import io
+import json
+import os
+import random
 from collections.abc import Callable
 from typing import Final
 
+import pytest
+
+import bitmatrix
+import diskclosure
+import dynamicreach
 import graphdestinations
 import matrix
 import matrix2
 import optimizedgraphdest
-from _resources import DirectedGraph, format_answer
+import parallelreach
+import reachindex
+import reachserver
+import sccreach
+from _resources import (
+    ANSWER_FORMATS,
+    DirectedGraph,
+    format_answer,
+    save_answer,
+    write_answer,
+)
 
+# The flight datasets are not kept in the repository, so are only tested if present.
 GRAPHS: Final[list[DirectedGraph]] = [
     DirectedGraph.read_file(k)
     for k in ["example.txt", "flights1.txt", "gistfile1.txt"]
     + [f"random_{z}.txt" for z in range(4)]
+    if os.path.exists(k)
+]
+
+SMALL_GRAPHS: Final[list[DirectedGraph]] = [
+    DirectedGraph.read_file(k)
+    for k in ["example.txt"] + [f"random_{z}.txt" for z in range(4)]
 ]
 
 EXAMPLE_SOLN: Final[
@@ -30,12 +58,160 @@ def test_graphdestinations():
 
 
 def test_functions():
-    funcs = [optimizedgraphdest.reachable, matrix.reachable, matrix2.reachable]
+    funcs = [
+        optimizedgraphdest.reachable,
+        matrix.reachable,
+        matrix2.reachable,
+        sccreach.reachable,
+        bitmatrix.reachable,
+        diskclosure.reachable,
+        dynamicreach.reachable,
+        reachindex.reachable,
+        parallelreach.reachable,
+    ]
     for g in GRAPHS:
         for f in funcs:
             assert process_soln(f(g)) == process_soln(graphdestinations.reachable(g))
 
 
+def test_dynamic_updates():
+    rng = random.Random(42)
+    for g in SMALL_GRAPHS:
+        index = dynamicreach.DynamicReachability(g)
+        edges = {(a, b) for a in g.vertices for b in g.edges.get(a, [])}
+        for _ in range(60):
+            if edges and rng.random() < 0.5:
+                a, b = rng.choice(sorted(edges))
+                index.remove_edge(a, b)
+                edges.remove((a, b))
+            else:
+                a, b = rng.choice(g.vertices), rng.choice(g.vertices)
+                index.add_edge(a, b)
+                edges.add((a, b))
+            assert process_soln(index.result()) == process_soln(
+                graphdestinations.reachable(index.to_graph())
+            )
+
+
+def test_reach_index_pairs():
+    for g in SMALL_GRAPHS:
+        index = reachindex.ReachIndex(g, seed=1)
+        closure = graphdestinations.reachable(g)
+        for u in g.vertices:
+            # A vertex reaches itself if it is on a cycle.
+            on_cycle = any(w == u or u in closure[w] for w in g.edges.get(u, []))
+            for v in g.vertices:
+                expected = on_cycle if u == v else v in closure[u]
+                assert index.reaches(u, v) == expected
+
+
+def test_read_string():
+    graph = DirectedGraph.read_string("A B\n\nB C\n")
+    assert dict(graph.edges) == {"A": ["B"], "B": ["C"]}
+    with pytest.raises(ValueError):
+        DirectedGraph.read_string("A B C\nD E F")
+
+
+def test_edge_lists():
+    graph = DirectedGraph.read_file("example.txt")
+    assert "D" not in graph.edges and "D" not in list(graph.edges)
+    assert graph.edges["D"] == []
+    assert all(vertex in graph.edges for vertex in graph.edges)
+    assert len(graph.edges) == len(list(graph.edges))
+
+
+def test_read_cache(tmp_path):
+    filename = str(tmp_path / "graph.txt")
+    with open("example.txt", "rt") as infile, open(filename, "wt") as outfile:
+        outfile.write(infile.read())
+    expected = process_soln(DirectedGraph.read_file(filename, cache=True).edges)
+    assert os.path.exists(filename + ".npz")
+    assert process_soln(DirectedGraph.read_file(filename, cache=True).edges) == expected
+    # A damaged cache is ignored and made again.
+    with open(filename + ".npz", "r+b") as cache:
+        cache.truncate(10)
+    assert process_soln(DirectedGraph.read_file(filename, cache=True).edges) == expected
+    assert process_soln(DirectedGraph.read_file(filename, cache=True).edges) == expected
+    assert sorted(os.listdir(tmp_path)) == ["graph.txt", "graph.txt.npz"]
+
+
+def test_reachability_result():
+    for g in GRAPHS:
+        result = sccreach.reachable(g)
+        expected = graphdestinations.reachable(g)
+        assert len(result) == len(expected)
+        assert list(result) == list(expected)
+        assert all(vertex in result for vertex in expected)
+        assert "not a vertex" not in result
+        assert process_soln(result.to_dict()) == process_soln(expected)
+        origins = list(expected)[:3]
+        sets = [set(expected[k]) for k in origins]
+        assert set(result.union(*origins)) == set.union(*sets)
+        assert set(result.intersection(*origins)) == set.intersection(*sets)
+        assert set(result.difference(*origins)) == sets[0].difference(*sets[1:])
+        for origin in origins:
+            assert result.count(origin) == len(expected[origin])
+            assert all(result.reaches(origin, dest) for dest in expected[origin])
+
+
+def test_query_order():
+    queries = [
+        {"origin": "A"},
+        {"origin": "A", "dest": "C"},
+        {"origin": "Z"},
+        {"dest": "A"},
+        {"origin": "E", "dest": "A"},
+        {"origin": "D"},
+        {"origin": "C"},
+    ]
+
+    async def ask() -> list[dict]:
+        service = reachserver.ReachService("example.txt")
+        server = await asyncio.start_server(service.handle, reachserver.HOST, 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            return await reachserver.query_many(queries, 3, port=port)
+
+    answers = asyncio.run(ask())
+    assert answers[0] == {"origin": "A", "destinations": ["B", "D", "E"]}
+    assert answers[1] == {"origin": "A", "dest": "C", "reaches": False}
+    assert "error" in answers[2] and "error" in answers[3]
+    assert answers[4] == {"origin": "E", "dest": "A", "reaches": True}
+    assert answers[5] == {"origin": "D", "destinations": []}
+    assert answers[6] == {"origin": "C", "destinations": ["A", "B", "D", "E"]}
+
+
+def test_answer_formats(tmp_path):
+    output = graphdestinations.reachable(DirectedGraph.read_file("example.txt"))
+    rows = [
+        line.replace(":", "").replace(",", "").split()
+        for line in EXAMPLE_SOLN.splitlines()
+    ]
+    for fmt in ANSWER_FORMATS:
+        buffer = io.StringIO()
+        write_answer(output, buffer, fmt)
+        text = buffer.getvalue()
+        if fmt == "text":
+            assert text.strip() == EXAMPLE_SOLN
+        elif fmt == "tsv":
+            assert text.splitlines() == ["\t".join(row) for row in rows]
+        else:
+            assert [json.loads(k) for k in text.splitlines()] == [
+                {"origin": row[0], "destinations": row[1:]} for row in rows
+            ]
+        plain = str(tmp_path / f"answer.{fmt}")
+        save_answer(output, fmt, plain)
+        with open(plain, "rt", encoding="utf-8") as infile:
+            assert infile.read() == text
+        compressed = plain + ".gz"
+        save_answer(output, fmt, compressed)
+        with gzip.open(compressed, "rt", encoding="utf-8") as infile:
+            assert infile.read() == text
+    with pytest.raises(ValueError):
+        write_answer(output, io.StringIO(), "csv")
+
+
 def process_soln(soln: dict[str, list[str]]) -> frozenset[tuple[str, frozenset[str]]]:
     """Change solution so that the order of elements listed is irrelvent."""
     return frozenset([(key, frozenset(value)) for key, value in soln.items()])
+